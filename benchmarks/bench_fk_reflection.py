@@ -0,0 +1,47 @@
+"""外键反射耗时对比：逐表 Inspector 路径 vs 批量目录查询。
+
+用法: python benchmarks/bench_fk_reflection.py [表数量]
+在临时SQLite库上运行，输出两种路径的耗时与目录查询(往返)次数。
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+
+from diagram_reflection import reflect_foreign_keys, count_queries, fk_relations
+
+
+def build_chain_db(path, table_count):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t_0 (id INTEGER PRIMARY KEY)")
+    for i in range(1, table_count):
+        conn.execute(f"CREATE TABLE t_{i} (id INTEGER PRIMARY KEY, parent_id INTEGER REFERENCES t_{i - 1}(id))")
+    conn.commit(); conn.close()
+
+
+def run(table_count):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        build_chain_db(db_path, table_count)
+        results = {}
+        for label, bulk in (("inspector", False), ("bulk", True)):
+            engine = create_engine(f"sqlite:///{db_path}")
+            with count_queries(engine) as counter:
+                start = time.perf_counter()
+                relations = fk_relations(reflect_foreign_keys(engine, bulk=bulk))
+                elapsed = time.perf_counter() - start
+            engine.dispose()
+            results[label] = (elapsed, counter.count, len(relations))
+            print(f"{label:>10}: {elapsed * 1000:9.1f} ms  queries={counter.count:<6} relations={len(relations)}")
+        assert results["inspector"][2] == results["bulk"][2], "两种路径得到的关系数不一致"
+        print(f"往返次数减少 {results['inspector'][1] / max(results['bulk'][1], 1):.0f}x，"
+              f"耗时加速 {results['inspector'][0] / max(results['bulk'][0], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,51 @@
+"""命名约定推断性能基准：在合成元数据上运行索引化推断引擎。
+
+用法: python benchmarks/bench_inference.py [表数量] [每表列数]
+默认 10k 张表、共 200k 列，要求推断在 1 秒内完成。
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diagram_inference import InferenceEngine
+
+
+def build_metadata(table_count, cols_per_table, seed=42):
+    rng = random.Random(seed)
+    styles = (lambda i: f"entity_{i}s", lambda i: f"t_entity_{i}", lambda i: f"tbl_Entity{i}")
+    names = [styles[i % len(styles)](i) for i in range(table_count)]
+    metadata = {}
+    for i, name in enumerate(names):
+        cols = ['id']
+        for j in range(cols_per_table - 1):
+            target, kind = rng.randrange(table_count), rng.random()
+            if kind < 0.2:
+                cols.append(f"entity_{target}_id")
+            elif kind < 0.3:
+                cols.append(f"entity{target}Id")
+            else:
+                cols.append(f"attr_{j}")
+        metadata[name] = {'cols': cols, 'pks': ['id']}
+    return metadata
+
+
+def run(table_count, cols_per_table):
+    metadata = build_metadata(table_count, cols_per_table)
+    column_count = sum(len(info['cols']) for info in metadata.values())
+    engine = InferenceEngine.from_config()
+    start = time.perf_counter()
+    relations = engine.infer(metadata)
+    elapsed = time.perf_counter() - start
+    print(f"tables={table_count} columns={column_count} relations={len(relations)} time={elapsed * 1000:.1f} ms")
+    return elapsed
+
+
+if __name__ == "__main__":
+    tables = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    elapsed = run(tables, cols)
+    if tables >= 10000 and elapsed >= 1.0:
+        sys.exit(f"推断耗时 {elapsed:.2f}s，超过 1 秒预算")
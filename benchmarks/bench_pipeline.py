@@ -0,0 +1,207 @@
+"""端到端流水线基准：在合成SQLite库上分阶段计时，结果写入 JSON 便于跨版本对比。
+
+用法:
+    python benchmarks/bench_pipeline.py [--tables 100 1000 10000] [--shapes star chain random wide]
+                                        [--output 结果.json] [--baseline 上次结果.json]
+
+结果默认写入系统临时目录下的 bench_results.json，不会落在当前工作目录中。
+阶段: 创建引擎、外键反射、列反射、命名推断、图构建、DOT 生成、Graphviz 布局。
+完全离线运行；系统未安装 Graphviz 时布局阶段记为 skipped。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy
+
+from diagram_cache import reflect_snapshot, snapshot_tables_metadata
+from diagram_core import build_dot_source, classify_nodes, get_default_styles
+from diagram_inference import InferenceEngine
+from diagram_partition import choose_layout, get_default_render_settings
+from diagram_reflection import count_queries, create_db_engine, fk_relations, reflect_foreign_keys
+
+SHAPES = ('star', 'chain', 'random', 'wide')
+STAGES = ('engine', 'reflect_fk', 'reflect_columns', 'inference', 'graph', 'dot', 'layout')
+
+
+# --- 合成库生成 ---
+# 表名 entity_{i}，外键列 entity_{j}_id，使外键反射与命名推断得到同一组关系
+def _fk_targets(shape, i, table_count, rng):
+    if i == 0: return []
+    if shape == 'chain': return [i - 1]
+    if shape == 'star':
+        # 少量维度表被大量事实表引用
+        hubs = max(1, table_count // 50)
+        return [] if i < hubs else sorted({rng.randrange(hubs) for _ in range(rng.randint(1, 3))})
+    return sorted({rng.randrange(i) for _ in range(rng.randint(0, 3))})
+
+
+def build_db(path, table_count, shape, columns=None, seed=42):
+    """生成合成库，返回 (外键数, 总列数)。wide 为 random 拓扑加大量普通列。"""
+    if shape not in SHAPES: raise ValueError(f"未知的拓扑: {shape}")
+    rng, columns = random.Random(seed), columns or (80 if shape == 'wide' else 6)
+    statements, fk_count, column_count = [], 0, 0
+    for i in range(table_count):
+        targets = _fk_targets(shape, i, table_count, rng)
+        cols = ["id INTEGER PRIMARY KEY"] + [f"attr_{j} TEXT" for j in range(columns)]
+        cols += [f"entity_{t}_id INTEGER REFERENCES entity_{t}(id)" for t in targets]
+        statements.append(f"CREATE TABLE entity_{i} ({', '.join(cols)});")
+        fk_count += len(targets); column_count += len(cols)
+    conn = sqlite3.connect(path)
+    conn.executescript("BEGIN;\n" + "\n".join(statements) + "\nCOMMIT;")
+    conn.close()
+    return fk_count, column_count
+
+
+# --- 分阶段计时 ---
+def _timed(stages, name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    stages[name] = {'seconds': round(time.perf_counter() - start, 6)}
+    return result
+
+
+def _build_graph(fks):
+    # 与渲染前的图构建一致：外键转关系集合，再按出入度分类节点
+    relations = fk_relations(fks)
+    return relations, classify_nodes(relations)
+
+
+def _graphviz_layout(dot_source, engine, fmt, timeout):
+    if not shutil.which(engine): return {'seconds': None, 'status': 'skipped', 'reason': f"未找到 {engine}"}
+    start = time.perf_counter()
+    try:
+        subprocess.run([engine, f"-T{fmt}", "-o", os.devnull], input=dot_source.encode('utf-8'), check=True,
+                       timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except subprocess.TimeoutExpired:
+        return {'seconds': None, 'status': 'timeout', 'reason': f"超过 {timeout}s"}
+    except subprocess.CalledProcessError as e:
+        return {'seconds': None, 'status': 'error', 'reason': e.stderr.decode('utf-8', 'replace').strip()[:200]}
+    return {'seconds': round(time.perf_counter() - start, 6), 'status': 'ok'}
+
+
+def run_scenario(table_count, shape, columns=None, layout=True, layout_format='svg', layout_timeout=300,
+                 threshold=None):
+    style = get_default_styles()
+    threshold = threshold or get_default_render_settings()['large_graph_threshold']
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        fk_count, column_count = build_db(db_path, table_count, shape, columns)
+        stages = {}
+        engine = _timed(stages, 'engine', create_db_engine, 'SQLite', {'数据库': db_path})
+        try:
+            with count_queries(engine) as counter:
+                fks = _timed(stages, 'reflect_fk', reflect_foreign_keys, engine)
+            stages['reflect_fk']['queries'] = counter.count
+            with count_queries(engine) as counter:
+                snapshot = _timed(stages, 'reflect_columns', reflect_snapshot, engine)
+            stages['reflect_columns']['queries'] = counter.count
+        finally:
+            engine.dispose()
+    metadata = snapshot_tables_metadata(snapshot)
+    inferred = _timed(stages, 'inference', InferenceEngine.from_config().infer, metadata)
+    stages['inference']['relations'] = len(inferred)
+    relations, _ = _timed(stages, 'graph', _build_graph, fks)
+    stages['graph']['relations'] = len(relations)
+    node_count = len({n for rel in relations for n in rel})
+    layout_engine, splines = choose_layout(node_count, style['spline'], threshold)
+    label = f"bench {shape} {table_count}"
+    dot_source = _timed(stages, 'dot', build_dot_source, relations, style, label, layout_engine, splines)
+    stages['dot']['bytes'] = len(dot_source.encode('utf-8'))
+    stages['layout'] = _graphviz_layout(dot_source, layout_engine, layout_format, layout_timeout) if layout else \
+        {'seconds': None, 'status': 'skipped', 'reason': "--no-layout"}
+    stages['layout'].update(engine=layout_engine, splines=splines, format=layout_format)
+    return {'shape': shape, 'tables': table_count, 'columns': column_count, 'foreign_keys': fk_count,
+            'nodes': node_count, 'stages': stages,
+            'total_seconds': round(sum(s['seconds'] or 0 for s in stages.values()), 6)}
+
+
+# --- 运行环境与对比 ---
+def _graphviz_version():
+    if not shutil.which('dot'): return None
+    out = subprocess.run(['dot', '-V'], capture_output=True, text=True)
+    return (out.stderr or out.stdout).strip()
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment():
+    return {'timestamp': datetime.now().isoformat(timespec='seconds'), 'revision': _git_revision(),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'sqlalchemy': sqlalchemy.__version__, 'sqlite': sqlite3.sqlite_version, 'graphviz': _graphviz_version()}
+
+
+def compare(results, baseline):
+    """逐场景逐阶段打印 当前/基准 耗时比，> 1 表示变慢。"""
+    old = {(r['shape'], r['tables']): r for r in baseline['results']}
+    for r in results:
+        prev = old.get((r['shape'], r['tables']))
+        if prev is None: continue
+        ratios = []
+        for stage in STAGES:
+            cur, before = r['stages'].get(stage, {}).get('seconds'), prev['stages'].get(stage, {}).get('seconds')
+            if cur is not None and before: ratios.append(f"{stage}={cur / before:.2f}x")
+        print(f"  {r['shape']:>6} {r['tables']:>6}: {' '.join(ratios)}")
+
+
+def _format_row(r):
+    cells = []
+    for stage in STAGES:
+        seconds = r['stages'][stage]['seconds']
+        cells.append(f"{seconds * 1000:9.1f}" if seconds is not None else f"{r['stages'][stage]['status']:>9}")
+    return f"{r['shape']:>6} {r['tables']:>6} " + " ".join(cells)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="关系图流水线分阶段基准 (合成SQLite库，离线运行)")
+    parser.add_argument("--tables", type=int, nargs="+", default=[100, 1000, 10000], help="表数量 (默认: 100 1000 10000)")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES), help="外键拓扑 (默认: 全部)")
+    parser.add_argument("--columns", type=int, help="每表普通列数 (默认: wide 为 80，其余为 6)")
+    parser.add_argument("--output", default=os.path.join(tempfile.gettempdir(), "bench_results.json"),
+                        help="结果 JSON 路径 (默认: 系统临时目录下的 bench_results.json，避免写入工作树)")
+    parser.add_argument("--baseline", help="与之前的结果 JSON 对比各阶段耗时")
+    parser.add_argument("--no-layout", action="store_true", help="跳过 Graphviz 布局阶段")
+    parser.add_argument("--layout-format", default="svg", help="布局阶段的输出格式 (默认: svg)")
+    parser.add_argument("--layout-timeout", type=float, default=300, help="单次布局超时秒数 (默认: 300)")
+    parser.add_argument("--large-graph-threshold", type=int, help="切换 sfdp 的节点数阈值 (默认取渲染配置)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    print(f"{'shape':>6} {'tables':>6} " + " ".join(f"{s[:9]:>9}" for s in STAGES) + "  (ms)")
+    results = []
+    for table_count in args.tables:
+        for shape in args.shapes:
+            result = run_scenario(table_count, shape, args.columns, not args.no_layout, args.layout_format,
+                                  args.layout_timeout, args.large_graph_threshold)
+            results.append(result); print(_format_row(result), flush=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+        print(f"与基准 {args.baseline} ({baseline['environment'].get('revision')}) 对比:")
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
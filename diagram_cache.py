@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import inspect
+
+from diagram_reflection import (ALL_SCHEMAS, PG_SYSTEM_SCHEMAS, MYSQL_SYSTEM_SCHEMAS, reflect_table_markers,
+                                reflect_table_details)
+
+CACHE_DIR_NAME = "relationship_diagram_cache"
+CACHE_FORMAT_VERSION = 1
+
+
+def _write_gzip_json(path, data):
+    """先写同目录下的唯一临时文件再替换：并发任务写同一快照时互不覆盖对方的临时文件。
+
+    替换失败 (Windows 上目标正被另一任务替换或读取) 时返回 False，由调用方决定是否容忍。
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or None)
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        return True
+    except PermissionError:
+        os.remove(tmp_path); return False
+    except BaseException:
+        os.remove(tmp_path); raise
+
+
+def connection_identity(engine):
+    """连接身份：(方言, 主机, 端口, 数据库)。SQLite 使用数据库文件的绝对路径。"""
+    url = engine.url
+    database = url.database or ''
+    if engine.dialect.name == 'sqlite' and database and database != ':memory:':
+        database = os.path.abspath(database)
+    return engine.dialect.name, url.host or '', str(url.port or ''), database
+
+
+def _table_key(schema, table):
+    return f"{schema}\x1f{table}" if schema is not None else table
+
+
+def _split_table_key(key):
+    schema, sep, table = key.rpartition("\x1f")
+    return (schema if sep else None), table
+
+
+# --- 磁盘上的Schema快照缓存 ---
+# 每个连接一个 gzip 压缩的 JSON 文件，表条目格式:
+#   {"m": marker, "c": [[列名, 类型, 可空], ...], "p": [主键列], "f": [外键]}
+class SchemaCache:
+    def __init__(self, cache_dir, max_entries=20, max_age_days=30, workers=1):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.workers = workers
+
+    def _path_for(self, identity, scope):
+        # 扫描范围不同 (默认Schema / 全部Schema) 的快照各存一个文件，切换模式时不会互相覆盖
+        digest = hashlib.sha1("\x1f".join((*identity, scope)).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"{digest}.json.gz")
+
+    def _read(self, path, identity, scope):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('v') != CACHE_FORMAT_VERSION or data.get('id') != list(identity) or data.get('scope') != scope:
+            return {}
+        return data.get('tables', {})
+
+    def _write(self, path, identity, scope, tables):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # 同一数据库的两个任务同时刷新时内容相同，替换竞争失败的一方直接放弃
+        return _write_gzip_json(path, {'v': CACHE_FORMAT_VERSION, 'id': list(identity), 'scope': scope,
+                                       'tables': tables})
+
+    def evict(self, keep=None):
+        """淘汰策略：删除超过 max_age_days 未使用的快照，再按最近使用时间只保留 max_entries 个。"""
+        if not os.path.isdir(self.cache_dir): return 0
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json.gz"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass  # 已被并发任务淘汰
+        entries.sort(reverse=True)
+        cutoff, removed = time.time() - self.max_age_days * 86400, 0
+        for i, (mtime, path) in enumerate(entries):
+            if path != keep and (i >= self.max_entries or mtime < cutoff):
+                try:
+                    os.remove(path); removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def load_snapshot(self, engine, schemas=None, log=None, progress=None):
+        """返回最新的Schema快照 {table_key: 表条目}，只重新反射修改标记发生变化的表。"""
+        identity, scope = connection_identity(engine), json.dumps(schemas)
+        path = self._path_for(identity, scope)
+        markers = reflect_table_markers(engine, schemas)
+        if markers is None:
+            if log: log(f"方言 {engine.dialect.name} 不支持修改标记，快照缓存将完整刷新。", "INFO")
+            markers = {key: None for key in list_table_keys(engine, schemas)}
+        cached = self._read(path, identity, scope)
+        tables, stale = {}, set()
+        for (schema, table), marker in markers.items():
+            key = _table_key(schema, table)
+            entry = cached.get(key)
+            if entry is not None and marker is not None and entry.get('m') == marker:
+                tables[key] = entry
+            else:
+                stale.add((schema, table))
+        if log: log(f"Schema快照: {len(tables)} 张表命中缓存，{len(stale)} 张表需要重新反射。", "INFO")
+        if stale:
+            details = reflect_table_details(engine, stale, log=log, workers=self.workers, progress=progress)
+            for (schema, table), detail in details.items():
+                tables[_table_key(schema, table)] = detail_to_entry(detail, markers[(schema, table)])
+        if stale or len(tables) != len(cached):
+            self._write(path, identity, scope, tables)
+        else:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        self.evict(keep=path)
+        return tables
+
+
+def save_snapshot_file(path, tables):
+    """把快照导出为独立文件，供之后做Schema差异对比。先写临时文件再替换，中途中断不会留下损坏的快照。"""
+    if not _write_gzip_json(path, {'v': CACHE_FORMAT_VERSION, 'tables': tables}):
+        # 另一个任务正在替换同一文件；它写入的是同一时刻的快照，只有目标仍不存在时才算失败
+        if not os.path.exists(path): raise OSError(f"无法写入快照文件: {path}")
+    return path
+
+
+def load_snapshot_file(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('v') != CACHE_FORMAT_VERSION: raise ValueError(f"不支持的快照文件版本: {path}")
+    return data['tables']
+
+
+def detail_to_entry(detail, marker=None):
+    return {'m': marker, 'c': [[c['name'], str(c['type']), bool(c.get('nullable', True))] for c in detail['columns']],
+            'p': list(detail['pks']), 'f': detail['fks']}
+
+
+def reflect_snapshot(engine, schemas=None, log=None, workers=1, progress=None):
+    """不使用缓存，直接反射出与 SchemaCache.load_snapshot 相同结构的快照。"""
+    details = reflect_table_details(engine, list_table_keys(engine, schemas), log=log, workers=workers,
+                                    progress=progress)
+    return {_table_key(schema, table): detail_to_entry(detail) for (schema, table), detail in details.items()}
+
+
+def list_table_keys(engine, schemas):
+    inspector, schema_list = inspect(engine), schemas or [None]
+    if schemas == ALL_SCHEMAS:
+        schema_list = [s for s in inspector.get_schema_names() if s not in PG_SYSTEM_SCHEMAS + MYSQL_SYSTEM_SCHEMAS]
+    return [(s, t) for s in schema_list for t in inspector.get_table_names(schema=s)]
+
+
+def snapshot_foreign_keys(tables):
+    return [fk for entry in tables.values() for fk in entry['f']]
+
+
+def snapshot_schemas(tables):
+    return {_split_table_key(key)[0] for key in tables}
+
+
+def _er_name(schema, table, qualify):
+    return f"{schema}.{table}" if qualify and schema else table
+
+
+def snapshot_er_model(tables, qualify=None):
+    """转换为 ER 图与差异对比使用的 ({表名: {'columns': [[列名, 类型, 可空]], 'pks': [...]}}, 外键列表)。
+
+    快照含多个 Schema (如 PostgreSQL 扫描全部 Schema) 时表名写成 "schema.table"，外键中的表名同样改写，
+    避免不同 Schema 的同名表互相覆盖；qualify 为 None 时按快照自动判断。
+    """
+    if qualify is None: qualify = len(snapshot_schemas(tables)) > 1
+    er_tables = {_er_name(*_split_table_key(key), qualify): {'columns': entry['c'], 'pks': entry['p']}
+                 for key, entry in tables.items()}
+    fks = snapshot_foreign_keys(tables)
+    if qualify:
+        fks = [dict(fk, table=_er_name(fk['schema'], fk['table'], True),
+                    referred_table=_er_name(fk['referred_schema'] or fk['schema'], fk['referred_table'], True))
+               for fk in fks]
+    return er_tables, fks
+
+
+def snapshot_table_columns(tables):
+    """转换为数据采样使用的 [(schema, 表名, [[列名, 类型, 可空]], [主键列])]。"""
+    return [(*_split_table_key(key), entry['c'], entry['p']) for key, entry in tables.items()]
+
+
+def snapshot_tables_metadata(tables):
+    """转换为推断逻辑使用的 {表名: {'cols': [...], 'pks': [...]}} 结构。"""
+    return {_split_table_key(key)[1]: {'cols': [c[0] for c in entry['c']], 'pks': entry['p']}
+            for key, entry in tables.items()}
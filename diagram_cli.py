@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import sys
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from diagram_core import OUTPUT_FORMATS, DiagramPipeline, RenderError, cache_dir_for, load_config, print_log
+from diagram_focus import FOCUS_DIRECTIONS, parse_table_list
+from diagram_logging import file_log, open_log_file, tee_log
+from diagram_partition import PARTITION_MODES
+
+PASSWORD_ENV = "RELATIONSHIP_DIAGRAM_PASSWORD"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="relationship_diagram", description="无界面生成数据库关系图。不带参数运行时启动图形界面。")
+    parser.add_argument("--config", nargs="+", default=[], help="配置文件路径，可指定多个进行批量生成")
+    parser.add_argument("--config-list", help="文本文件，每行一个配置文件路径（# 开头为注释）")
+    parser.add_argument("--mode", choices=["fk", "inference", "multi", "er", "snapshot", "diff"],
+                        default="fk", help="生成模式：fk / inference / multi / er(列级ER图) / snapshot(保存快照) / "
+                                           "diff(差异对比，需 --baseline) (默认: fk)")
+    parser.add_argument("--baseline", help="diff 模式的对比基准：快照文件 (*.json.gz) 或另一个连接的配置文件")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="输出格式；dot/mermaid/plantuml/json 不需要 Graphviz (默认取配置 output_format，即 png)")
+    parser.add_argument("--output", help="覆盖配置中的输出目录")
+    parser.add_argument("--partition", choices=PARTITION_MODES, help="大图拆分方式，覆盖配置中的 render.partition")
+    parser.add_argument("--large-graph-threshold", type=int, help="节点数超过该值时改用 sfdp 布局")
+    parser.add_argument("--focus", help="聚焦模式：逗号分隔的种子表，只输出其邻域")
+    parser.add_argument("--hops", type=int, help="聚焦半径 (跳数，默认 2)")
+    parser.add_argument("--direction", choices=FOCUS_DIRECTIONS, help="聚焦方向 (默认 both)")
+    parser.add_argument("--sample-data", action="store_true",
+                        help="inference 模式下同时按列值采样推断关系 (预算见配置 sampling)")
+    parser.add_argument("--password", help=f"数据库密码；也可通过环境变量 {PASSWORD_ENV} 提供")
+    parser.add_argument("--no-cache", action="store_true", help="不使用Schema快照缓存")
+    parser.add_argument("--quiet", action="store_true", help="只输出错误")
+    parser.add_argument("--profile", action="store_true", help="用 cProfile 记录每次运行，统计写入输出目录的 *.prof 文件")
+    parser.add_argument("--metrics", help="把每个配置的分阶段耗时与计数器写入该 JSON 文件")
+    parser.add_argument("--log-file", help="同时把完整日志写入该文件 (按 5MB 轮转，不受 --quiet 影响)")
+    return parser
+
+
+def _read_config_list(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith('#')]
+
+
+def _with_password(config, password):
+    if password and not config["database"].get('密码'):
+        config["database"] = {**config["database"], '密码': password}
+    return config
+
+
+def _terminal_progress(stage, done, total):
+    # 只在交互终端上显示，覆盖同一行
+    if total: print(f"\r{stage}: {done}/{total}", end="\n" if done >= total else "", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config_paths = list(args.config)
+    if args.config_list: config_paths.extend(_read_config_list(args.config_list))
+    if not config_paths:
+        build_parser().error("需要至少一个 --config 或 --config-list")
+    if args.mode == "diff" and not args.baseline:
+        build_parser().error("diff 模式需要 --baseline")
+    password = args.password or os.environ.get(PASSWORD_ENV)
+    log = (lambda msg, level="INFO": level == "ERROR" and print_log(msg, level)) if args.quiet else print_log
+    if args.log_file: log = tee_log(log, file_log(open_log_file(args.log_file)))
+
+    progress = _terminal_progress if sys.stderr.isatty() and not args.quiet else None
+
+    failures, pipeline, metrics = 0, DiagramPipeline(log=log, progress=progress), {}
+    try:
+        for path in config_paths:
+            try:
+                config = _with_password(load_config(path), password)
+                if args.output: config["output_path"] = args.output
+                if args.partition: config["render"]["partition"] = args.partition
+                if args.sample_data: config["sampling"]["enabled"] = True
+                if args.focus: config["focus"]["tables"] = parse_table_list(args.focus)
+                if args.hops is not None: config["focus"]["hops"] = args.hops
+                if args.direction: config["focus"]["direction"] = args.direction
+                if args.large_graph_threshold: config["render"]["large_graph_threshold"] = args.large_graph_threshold
+                if args.profile: config["diagnostics"]["profile"] = True
+                cache_dir = None if args.no_cache else cache_dir_for(path)
+                if args.mode == "diff":
+                    baseline = args.baseline if args.baseline.endswith(".gz") else \
+                        _with_password(load_config(args.baseline), password)
+                    generated_paths = pipeline.run_diff(config, baseline, fmt=args.format, cache_dir=cache_dir,
+                                                        baseline_cache_dir=None if args.no_cache
+                                                        else cache_dir_for(args.baseline))
+                else:
+                    generated_paths = pipeline.run(config, mode=args.mode, fmt=args.format, cache_dir=cache_dir)
+                for generated in generated_paths:
+                    print(generated)
+            except (OSError, ValueError, SQLAlchemyError, RenderError, ImportError) as e:
+                # 批处理中单个配置失败不影响其余配置 (NoRelationsError 也是 ValueError)
+                failures += 1; log(f"❌ {path}: {e}", "ERROR")
+            finally:
+                if pipeline.metrics is not None: metrics[path] = pipeline.metrics.as_dict()
+                pipeline.metrics = None
+    finally:
+        pipeline.close()
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+    if len(config_paths) > 1: log(f"批量生成完成: {len(config_paths) - failures}/{len(config_paths)} 成功", "INFO")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
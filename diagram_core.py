@@ -0,0 +1,722 @@
+import contextlib
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from sqlalchemy import inspect
+
+from diagram_cache import (CACHE_DIR_NAME, SchemaCache, load_snapshot_file, reflect_snapshot, save_snapshot_file,
+                           snapshot_er_model, snapshot_table_columns, snapshot_tables_metadata)
+from diagram_diff import diff_graph, diff_snapshots, diff_summary, has_changes
+from diagram_export import (DIFF_TEXT_FORMATS, TEXT_FORMATS, export_text, export_er_text, export_diff_text, iter_dot, iter_er_dot,
+                            iter_diff_dot)
+from diagram_focus import AdjacencyIndex, focus_relations, get_default_focus_settings
+from diagram_graph import NodeKinds
+from diagram_inference import InferenceEngine, get_default_inference_settings
+from diagram_jobs import JobCancelledError
+from diagram_metrics import RunMetrics, get_default_diagnostics_settings, profiled, timed_stage
+from diagram_partition import (get_default_render_settings, partition_relations, choose_layout, safe_file_part,
+                               write_index_page)
+from diagram_reflection import (ALL_SCHEMAS, create_db_engine, reflect_foreign_keys, count_queries, fk_relations,
+                                reflect_targets, merge_target_relations, progress_advancer)
+from diagram_sampling import DataInference, get_default_sampling_settings
+from diagram_restyle import LAYOUT_STYLE_KEYS, RetainedGraph, color_replacements, recolor_layout, style_changes
+
+# 该模块不依赖 tkinter / sv_ttk，供命令行与批处理使用；Graphviz 以子进程方式调用，可随时终止
+GRAPHVIZ_FORMATS = ('png', 'svg', 'pdf')
+OUTPUT_FORMATS = GRAPHVIZ_FORMATS + tuple(TEXT_FORMATS)
+DIFF_FORMATS = GRAPHVIZ_FORMATS + DIFF_TEXT_FORMATS
+CONFIG_FILE_NAME = "relationship_diagram_config.json"
+
+
+class NoRelationsError(ValueError):
+    pass
+
+
+class RenderError(RuntimeError):
+    pass
+
+
+def print_log(msg, level="INFO"):
+    print(f"[{level}] {msg}", file=sys.stderr)
+
+
+def quiet_log(msg, level="INFO"):
+    pass
+
+
+# --- 配置 ---
+def get_default_styles():
+    return {'layout': 'TB', 'spline': 'ortho', 'bg_color': '#FAFAFA', 'node_color_default': '#87CEEB',
+            'node_color_start': '#FFDDC1', 'node_color_link': '#D1FFBD', 'node_color_end': '#E0BBE4',
+            'node_color_added': '#A5D6A7', 'node_color_removed': '#EF9A9A', 'node_color_changed': '#FFE082'}
+
+
+def get_default_cache_settings():
+    return {'enabled': True, 'max_entries': 20, 'max_age_days': 30}
+
+
+def get_default_parallel_settings():
+    # workers: 单次反射的线程数；jobs: 图形界面中同时执行的任务数
+    return {'workers': 4, 'merge_mode': 'combined', 'jobs': 2}
+
+
+def get_default_config():
+    return {"db_type": "MySQL", "database": {}, "output_path": os.getcwd(), "output_format": "png",
+            "graph_style": get_default_styles(),
+            "schema_cache": get_default_cache_settings(), "inference": get_default_inference_settings(),
+            "parallel": get_default_parallel_settings(), "render": get_default_render_settings(),
+            "focus": get_default_focus_settings(), "diagnostics": get_default_diagnostics_settings(),
+            "sampling": get_default_sampling_settings(), "targets": []}
+
+
+def merge_config(raw):
+    """用默认值补全配置；字典类型的分节逐键合并。"""
+    config = get_default_config()
+    for key, value in raw.items():
+        config[key] = {**config[key], **value} if isinstance(config.get(key), dict) and isinstance(value, dict) \
+            else value
+    return config
+
+
+def load_config(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return merge_config(json.load(f))
+
+
+def cache_dir_for(config_path):
+    return os.path.join(os.path.dirname(os.path.abspath(config_path)), CACHE_DIR_NAME)
+
+
+def output_db_name(db_type, database):
+    db_name = database or "db"
+    if db_type == 'SQLite' and database: db_name = os.path.splitext(os.path.basename(database))[0]
+    return db_name
+
+
+def worker_count(config):
+    try:
+        return max(1, int(config["parallel"]["workers"]))
+    except (KeyError, TypeError, ValueError):
+        return 1
+
+
+# --- 图形构建与渲染 ---
+def classify_nodes(relations):
+    """按出入度把节点分为 start / link / end 三类，返回只读映射 (见 diagram_graph.NodeKinds)。"""
+    return NodeKinds(relations)
+
+
+def build_dot_source(relations, style, label, engine="dot", splines=None, stubs=()):
+    return "".join(iter_dot(relations, classify_nodes(relations), style, label, splines, engine, stubs))
+
+
+def render_graph(relations, style, label, output_filename, fmt="png", log=print_log, threshold=None, stubs=(),
+                 metrics=None, cancel=None):
+    if not relations: raise NoRelationsError("未能找到任何表间关系。")
+    if fmt not in OUTPUT_FORMATS: raise ValueError(f"不支持的输出格式: {fmt}")
+    log(f"✅ 找到 {len(relations)} 条关系，开始渲染图表...", "INFO")
+    if fmt in TEXT_FORMATS:
+        # 文本格式直接由 Python 生成，不调用 Graphviz
+        with timed_stage(metrics, "文本导出"):
+            path = export_text(relations, classify_nodes(relations), style, label, output_filename, fmt, stubs=stubs)
+        return _count_output(metrics, path, fmt)
+    with timed_stage(metrics, "节点分类"):
+        kinds = classify_nodes(relations)
+    engine, splines = choose_layout(len(kinds), style['spline'], threshold or float('inf'))
+    if engine != 'dot': log(f"节点数 {len(kinds)} 超过阈值，改用 {engine} 布局 (splines={splines})", "INFO")
+    # DOT 边生成边写入 Graphviz，生成耗时计入布局阶段
+    return _render_with_graphviz(iter_dot(relations, kinds, style, label, splines, engine, stubs), output_filename,
+                                 fmt, engine, metrics, cancel)
+
+
+def render_retained(graph, style, output_filename, fmt="png", log=print_log, metrics=None, cancel=None, dpi=None):
+    """用保存的关系集按 style 出图，不访问数据库。返回 (路径, 本次布局对应的 RetainedGraph)。
+
+    graph 已有布局且只改了颜色时，逐行替换布局文件中的颜色后用 neato -n2 直接绘制，跳过布局计算；
+    否则先用 -Tdot 把布局写入临时文件 (由返回的 RetainedGraph 持有)，再绘制。dpi 用于缩小预览图。
+    """
+    if not graph.relations: raise NoRelationsError("未能找到任何表间关系。")
+    if fmt not in OUTPUT_FORMATS: raise ValueError(f"不支持的输出格式: {fmt}")
+    if graph.layout_path is None: log(f"✅ 找到 {len(graph.relations)} 条关系，开始渲染图表...", "INFO")
+    if fmt in TEXT_FORMATS:
+        with timed_stage(metrics, "文本导出"):
+            path = export_text(graph.relations, graph.kinds, style, graph.label, output_filename, fmt)
+        return _count_output(metrics, path, fmt), graph
+    laid_out, replacements = _retained_layout(graph, style, log, metrics, cancel)
+    # 已布局的 DOT 带有 pos 坐标，neato -n2 只绘制不重新布局
+    args = ("-n2",) + ((f"-Gdpi={dpi}",) if dpi else ())
+    try:
+        with open(laid_out.layout_path, 'r', encoding='utf-8') as f:
+            lines = recolor_layout(f, replacements) if replacements else f
+            path = _render_with_graphviz(lines, output_filename, fmt, "neato", metrics, cancel, args, "Graphviz绘制")
+    except BaseException:
+        # 本次新建的布局尚未交给调用方，取消或失败时在这里删除，避免遗留临时文件
+        if laid_out is not graph: laid_out.discard()
+        raise
+    return path, laid_out
+
+
+def _retained_layout(graph, style, log=print_log, metrics=None, cancel=None):
+    """返回 (graph, 颜色替换表)。graph 的布局可复用 (只改了颜色) 时原样返回并给出替换表；
+    否则用 -Tdot 把布局写入临时文件，返回带新布局的 RetainedGraph 与 None。"""
+    if graph.has_layout() and not style_changes(graph.style, style) & LAYOUT_STYLE_KEYS:
+        replacements = color_replacements(graph.style, style, graph.node_color_keys())
+        if replacements is not None:
+            log("仅颜色变化，复用上次的布局。", "INFO"); return graph, replacements
+        log("多个样式项使用了同一颜色，无法只替换颜色，重新布局。", "INFO")
+    engine, splines = choose_layout(len(graph.kinds), style['spline'], graph.threshold or float('inf'))
+    if engine != 'dot': log(f"节点数 {len(graph.kinds)} 超过阈值，改用 {engine} 布局 (splines={splines})", "INFO")
+    fd, layout_path = tempfile.mkstemp(prefix="relationship_diagram_layout_", suffix=".gv"); os.close(fd)
+    try:
+        with timed_stage(metrics, "Graphviz布局"):
+            written, _ = _run_graphviz(["dot", f"-K{engine}", "-Tdot", "-o", layout_path],
+                                       iter_dot(graph.relations, graph.kinds, style, graph.label, splines, engine), cancel)
+    except BaseException:
+        os.remove(layout_path); raise
+    if metrics is not None: metrics.add('dot_bytes', written)
+    return graph.with_layout(style, layout_path), None
+
+
+def layout_plain(graph, style, log=print_log, metrics=None, cancel=None):
+    """返回 (Graphviz plain 格式的布局文本, 本次布局对应的 RetainedGraph)，供内置查看器使用。
+
+    plain 只含坐标，颜色由查看器按样式自行决定，所以只有布局方向/连线样式改变时才重新布局。
+    """
+    if not graph.relations: raise NoRelationsError("未能找到任何表间关系。")
+    laid_out = graph
+    if not (graph.has_layout() and not style_changes(graph.style, style) & LAYOUT_STYLE_KEYS):
+        laid_out, _ = _retained_layout(graph, style, log, metrics, cancel)
+    try:
+        with open(laid_out.layout_path, 'r', encoding='utf-8') as f, timed_stage(metrics, "Graphviz绘制"):
+            _, out = _run_graphviz(["dot", "-Kneato", "-n2", "-Tplain"], f, cancel, capture=True)
+    except BaseException:
+        if laid_out is not graph: laid_out.discard()
+        raise
+    return out.decode('utf-8', 'replace'), laid_out
+
+
+def _count_output(metrics, path, fmt):
+    if metrics is not None:
+        metrics.add('files')
+        if fmt == 'dot': metrics.add('dot_bytes', os.path.getsize(path))
+    return path
+
+
+def _render_with_graphviz(source, output_filename, fmt, engine="dot", metrics=None, cancel=None, args=(),
+                          stage="Graphviz布局"):
+    """DOT 经标准输入交给 Graphviz 子进程，先写入临时文件，成功后再原子替换为最终文件。
+
+    source 可以是字符串或逐段产生 DOT 文本的可迭代对象 (如 iter_dot)，后者边生成边写入，
+    整份 DOT 不会同时驻留内存。cancel (具有 is_set() 的取消标记) 被置位时立即终止子进程，
+    不会留下写了一半的输出。
+    """
+    path = f"{output_filename}.{fmt}"
+    tmp_path = f"{path}.part"
+    try:
+        with timed_stage(metrics, stage):
+            written, _ = _run_graphviz(["dot", f"-K{engine}", *args, f"-T{fmt}", "-o", tmp_path], source, cancel)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+    if metrics is not None: metrics.add('dot_bytes', written); metrics.add('files')
+    return path
+
+
+def _iter_blocks(source, block_size=1 << 16):
+    """把逐段生成的 DOT 文本合并为约 block_size 字符的块再编码，减少写管道的次数。"""
+    if isinstance(source, str): source = (source,)
+    buf, size = [], 0
+    for chunk in source:
+        buf.append(chunk); size += len(chunk)
+        if size >= block_size:
+            yield "".join(buf).encode('utf-8'); buf, size = [], 0
+    if buf: yield "".join(buf).encode('utf-8')
+
+
+def _run_graphviz(cmd, source, cancel=None, poll_interval=0.2, capture=False):
+    """把 source (字符串或文本块的可迭代对象) 写入 Graphviz 的标准输入，返回 (写入字节数, 标准输出)。
+
+    标准输出/错误由后台线程读取，避免管道写满时双方互相等待；capture 为 False 时标准输出为 None。
+    """
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+                                stderr=subprocess.PIPE)
+    except OSError as e:
+        raise RenderError(f"无法调用Graphviz生成图片，请确保它已安装并添加到系统PATH环境变量。\n\n错误: {e}") from e
+    outputs = {}
+
+    def drain(name, pipe):
+        outputs[name] = pipe.read()
+    readers = [(threading.Thread(target=drain, args=(name, pipe), daemon=True), pipe)
+               for name, pipe in (('stdout', proc.stdout), ('stderr', proc.stderr)) if pipe]
+    for reader, _ in readers: reader.start()
+    written, finished = 0, False
+    try:
+        try:
+            for block in _iter_blocks(source):
+                if cancel is not None and cancel.is_set(): raise JobCancelledError("任务已取消。")
+                proc.stdin.write(block); written += len(block)
+        except OSError:
+            # Graphviz 提前退出 (通常是语法错误)，原因在 stderr 中，按退出码报告
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+        while True:
+            try:
+                proc.wait(timeout=poll_interval); break
+            except subprocess.TimeoutExpired:
+                if cancel is not None and cancel.is_set(): raise JobCancelledError("任务已取消。")
+        finished = True
+    finally:
+        if proc.poll() is None: proc.kill(); proc.wait()
+        # 被终止的进程若留下子进程仍持有管道，读取线程不会结束；取消时只等待片刻
+        for reader, pipe in readers:
+            reader.join(None if finished else 1.0)
+            if not reader.is_alive(): pipe.close()
+    if proc.returncode != 0:
+        raise RenderError(f"Graphviz 渲染失败 (退出码 {proc.returncode}):\n\n"
+                          f"{outputs.get('stderr', b'').decode('utf-8', 'replace').strip()}")
+    return written, outputs.get('stdout')
+
+
+def render_er(tables, fks, style, label, output_filename, fmt="png", log=print_log, metrics=None, cancel=None):
+    """列级 ER 图：节点列出列名、类型与 PK/FK 标记，连线连接具体的列。"""
+    if not tables: raise NoRelationsError("未能找到任何表。")
+    if fmt not in OUTPUT_FORMATS: raise ValueError(f"不支持的输出格式: {fmt}")
+    log(f"✅ {len(tables)} 张表、{len(fks)} 个外键，开始生成ER图...", "INFO")
+    kinds = classify_nodes(fk_relations(fks))
+    if fmt in TEXT_FORMATS:
+        with timed_stage(metrics, "文本导出"):
+            path = export_er_text(tables, fks, kinds, style, label, output_filename, fmt)
+        return _count_output(metrics, path, fmt)
+    return _render_with_graphviz(iter_er_dot(tables, fks, kinds, style, label), output_filename, fmt, metrics=metrics,
+                                 cancel=cancel)
+
+
+def check_diff_format(fmt):
+    if fmt not in DIFF_FORMATS:
+        raise ValueError(f"差异模式不支持 {fmt} 格式，请使用 {'/'.join(DIFF_FORMATS)}。")
+
+
+def render_diff(diff, style, label, output_filename, fmt="png", log=print_log, metrics=None, cancel=None):
+    """差异图只包含变化的表、变化的外键及其直接邻居。"""
+    check_diff_format(fmt)
+    if not has_changes(diff): raise NoRelationsError("两份Schema之间没有差异。")
+    log(f"Schema差异: {diff_summary(diff)}", "INFO")
+    status, edges = diff_graph(diff)
+    if fmt in TEXT_FORMATS:
+        with timed_stage(metrics, "文本导出"):
+            path = export_diff_text(status, edges, diff, style, label, output_filename, fmt)
+        return _count_output(metrics, path, fmt)
+    return _render_with_graphviz(iter_diff_dot(status, edges, diff, style, label), output_filename, fmt,
+                                 metrics=metrics, cancel=cancel)
+
+
+def _render_partition(relations, style, label, output_filename, fmt, threshold, stubs, cancel=None):
+    # 在子进程中执行；返回计数器供父进程合并
+    metrics = RunMetrics()
+    path = render_graph(relations, style, label, output_filename, fmt, quiet_log, threshold, stubs, metrics=metrics,
+                        cancel=cancel)
+    return path, metrics.counters
+
+
+def render_partitioned(relations, style, label, output_filename, fmt="png", render_conf=None, log=print_log,
+                       metrics=None, cancel=None):
+    """按分区拆成多张图，在多个进程中并行渲染，最后生成链接各分区的 HTML 索引页。返回 [分区文件..., 索引页]。"""
+    if not relations: raise NoRelationsError("未能找到任何表间关系。")
+    conf = {**get_default_render_settings(), **(render_conf or {})}
+    parts = partition_relations(relations, conf['partition'])
+    threshold = conf['large_graph_threshold']
+    if len(parts) == 1:
+        return [render_graph(relations, style, label, output_filename, fmt, log=log, threshold=threshold,
+                             metrics=metrics, cancel=cancel)]
+    jobs = [(part, f"{output_filename}_part{i:03d}_{safe_file_part(part['name'])}")
+            for i, part in enumerate(parts, 1)]
+    processes = max(1, min(int(conf['processes']), len(jobs)))
+    log(f"按 {conf['partition']} 拆分为 {len(parts)} 个分区，使用 {processes} 个进程并行渲染...", "INFO")
+    with timed_stage(metrics, "分区并行渲染"), contextlib.ExitStack() as stack:
+        # 取消标记需要跨进程传递，由 Manager 托管；Manager 先于进程池创建，保证子进程退出前它一直可用
+        stop = stack.enter_context(multiprocessing.Manager()).Event() if cancel is not None else None
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=processes))
+        futures = [pool.submit(_render_partition, part['relations'], style, f"{label} - {part['name']}", filename,
+                               fmt, threshold, frozenset(part['stubs']), stop) for part, filename in jobs]
+        advance = progress_advancer(metrics.progress if metrics is not None else None, len(futures))
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                if done: advance(len(done))
+                if cancel is not None and cancel.is_set(): raise JobCancelledError("任务已取消。")
+        except BaseException:
+            # 丢弃排队中的分区，并通知正在运行的子进程终止 Graphviz
+            if stop is not None: stop.set()
+            for future in futures: future.cancel()
+            raise
+        results = [future.result() for future in futures]
+    paths = [path for path, _ in results]
+    if metrics is not None:
+        for _, counters in results: metrics.merge_counters(counters)
+    entries = [(part['name'], path, len({n for rel in part['relations'] for n in rel} - part['stubs']),
+                len(part['relations'])) for (part, _), path in zip(jobs, paths)]
+    index_path = write_index_page(f"{output_filename}_index.html", label, entries)
+    log(f"已生成 {len(paths)} 个分区图与索引页: {index_path}", "INFO")
+    return paths + [index_path]
+
+
+# --- 流水线 ---
+class DiagramPipeline:
+    """反射 -> 关系提取 -> 渲染。引擎按连接参数缓存，批处理时多个配置文件共享同一个引擎。
+
+    progress(阶段名, 已完成, 总数) 在进度变化时回调；每次 run / run_diff 的统计保存在 self.metrics 中，
+    结束时以运行统计表的形式写入日志。cancel_token 被置位后，在下一个表批次、Schema 或渲染步骤之间
+    抛出 JobCancelledError，正在运行的 Graphviz 子进程会被终止。
+    """
+
+    def __init__(self, log=print_log, progress=None, cancel_token=None, retain_graph=False, jobs=1):
+        self.log, self.progress, self.cancel_token = log, progress, cancel_token
+        # jobs: 同时共享这组引擎的任务数，连接池按 每任务线程数 × jobs 分配
+        self.jobs = max(1, int(jobs))
+        self.metrics = None
+        self._engines, self._engine_lock = {}, threading.Lock()
+        # retain_graph 时保留最近一次单图生成的关系集与布局 (self.retained['graph'])，供 restyle 使用
+        self.retain_graph, self.retained, self._retained_lock = retain_graph, {}, threading.Lock()
+
+    def fork(self, log=None, progress=None, cancel_token=None):
+        """并发任务各用一个流水线（统计与取消标记互不干扰），但共享同一组引擎、连接池和保留的关系图。"""
+        child = DiagramPipeline(log or self.log, progress, cancel_token, self.retain_graph, self.jobs)
+        child._engines, child._engine_lock = self._engines, self._engine_lock
+        child.retained, child._retained_lock = self.retained, self._retained_lock
+        return child
+
+    def get_engine(self, db_type, details, pool_size=None):
+        """pool_size 为单个任务的线程数；并发任务共享引擎，连接池按 pool_size × jobs 创建，
+        否则两个任务的线程会互相等待连接直到超时。"""
+        key = (db_type, tuple(sorted(details.items())), pool_size)
+        with self._engine_lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self._engines[key] = create_db_engine(db_type, details,
+                                                               pool_size=pool_size and pool_size * self.jobs)
+        return engine
+
+    def engine_for(self, config):
+        return self.get_engine(config["db_type"], config["database"], worker_count(config))
+
+    def close(self):
+        with self._engine_lock:
+            for engine in self._engines.values(): engine.dispose()
+            self._engines.clear()
+        self._retain(None)
+
+    def _retain(self, graph):
+        with self._retained_lock:
+            old, self.retained['graph'] = self.retained.get('graph'), graph
+        if old is not None and (graph is None or old.layout_path != graph.layout_path): old.discard()
+
+    def _hold_retained(self, message):
+        """取出最近保留的关系图并登记为持有者，使用完后须调用 release()；被替换时布局文件延后删除。"""
+        with self._retained_lock:
+            graph = self.retained.get('graph')
+            if graph is None: raise NoRelationsError(message)
+            return graph.acquire()
+
+    # --- 统计 ---
+    def _stage(self, name, engine=None):
+        return timed_stage(self.metrics, name, engine)
+
+    def _count(self, name, value=1):
+        if self.metrics is not None: self.metrics.add(name, value)
+
+    def _table_progress(self):
+        return self.metrics.progress if self.metrics is not None else None
+
+    def _on_progress(self, stage, done, total):
+        # 每个阶段开始与每批表完成时都会经过这里，顺带作为取消检查点
+        if self.cancel_token is not None: self.cancel_token.raise_if_cancelled()
+        if self.progress: self.progress(stage, done, total)
+
+    def _instrumented(self, config, mode, func):
+        """为一次运行建立统计；按 diagnostics.profile 决定是否用 cProfile 包裹，结束时输出运行统计表。"""
+        self.metrics = RunMetrics(self._on_progress)
+        diagnostics = config.get("diagnostics") or {}
+        profile_path = None
+        if diagnostics.get("profile"):
+            db_name = output_db_name(config["db_type"], config["database"].get('数据库'))
+            profile_path = os.path.join(config["output_path"], f"relation_{db_name}_{mode}.prof")
+        try:
+            with profiled(diagnostics.get("profile"), profile_path, diagnostics.get("profile_top", 25), self.log):
+                return func()
+        finally:
+            for line in self.metrics.summary_lines(): self.log(line, "INFO")
+
+    # --- 反射 ---
+    def load_snapshot(self, engine, config, cache_dir, schemas=None):
+        # 禁用缓存或未提供缓存目录时返回 None，由调用方直接反射
+        conf = config["schema_cache"]
+        if not conf.get('enabled', True) or not cache_dir: return None
+        cache = SchemaCache(cache_dir, max_entries=conf.get('max_entries', 20), max_age_days=conf.get('max_age_days', 30),
+                            workers=worker_count(config))
+        return cache.load_snapshot(engine, schemas=schemas, log=self.log, progress=self._table_progress())
+
+    def collect_fk_relations(self, engine, config):
+        self.log("--- 开始基于外键生成 (SQLAlchemy) ---", "INFO")
+        schemas_to_scan = None
+        if engine.dialect.name == 'postgresql':
+            schemas_to_scan = ALL_SCHEMAS
+            self.log("检测到PostgreSQL，将扫描全部用户Schema", "INFO")
+        qualify = config["render"].get("partition") == 'schema'
+        # 外键模式不走快照缓存：一次批量目录查询即可取得全部外键，而快照校验本身就要一次查询，
+        # 过期的表还要逐表反射列与主键；快照缓存只用于需要列信息的模式 (推断、ER、差异、采样)
+        with self._stage("外键反射", engine), count_queries(engine) as counter:
+            fks = reflect_foreign_keys(engine, schemas=schemas_to_scan, log=self.log, workers=worker_count(config))
+        # 批量目录查询只返回有外键的表
+        self._count('tables', len({(fk['schema'], fk['table']) for fk in fks}))
+        self.log(f"外键反射完成: {len(fks)} 个外键，{counter.count} 次目录查询", "INFO")
+        return fk_relations(fks, qualify_schema=qualify)
+
+    def collect_inferred_relations(self, engine, config, cache_dir=None):
+        self.log("--- 开始基于约定推断 (SQLAlchemy) ---", "INFO")
+        sampling = config["sampling"].get("enabled")
+        if sampling:
+            # 数据采样需要列类型，直接取完整快照；范围与不采样时相同 (默认Schema)，表名不会跨Schema重名
+            snapshot = self.snapshot_for(config, cache_dir, all_schemas=False)
+            tables_metadata = snapshot_tables_metadata(snapshot)
+        else:
+            with self._stage("列反射", engine):
+                snapshot, tables_metadata = self.load_snapshot(engine, config, cache_dir), {}
+                if snapshot is not None:
+                    tables_metadata = snapshot_tables_metadata(snapshot)
+                else:
+                    inspector = inspect(engine)
+                    table_names = inspector.get_table_names()
+                    advance = progress_advancer(self._table_progress(), len(table_names))
+                    for tbl_name in table_names:
+                        tables_metadata[tbl_name] = {'cols': [c['name'] for c in inspector.get_columns(tbl_name)],
+                                                     'pks': inspector.get_pk_constraint(tbl_name)['constrained_columns']}
+                        advance()
+            self._count('tables', len(tables_metadata))
+        self.log("正在根据命名约定推断关系...", "INFO")
+        with self._stage("命名推断"):
+            relations = InferenceEngine.from_config(config["inference"]).infer(tables_metadata)
+        if sampling:
+            sampled = self.collect_sampled_relations(engine, config, snapshot)
+            self.log(f"数据采样新增 {len(sampled - relations)} 条命名约定未覆盖的关系。", "INFO")
+            relations |= sampled
+        return relations
+
+    def collect_sampled_relations(self, engine, config, snapshot):
+        """按列值包含关系推断 (见 diagram_sampling)，受配置 sampling 中的时间与行数预算约束。"""
+        conf = config["sampling"]
+        sampler = DataInference.from_config(conf, config["inference"].get('table_prefixes', ()))
+        self.log(f"正在采样列数据推断关系 (预算 {sampler.time_budget_s:g}s / {sampler.row_budget:,} 行)...", "INFO")
+        with self._stage("数据采样"):
+            relations = sampler.infer(engine, snapshot_table_columns(snapshot), worker_count(config),
+                                      self._table_progress(), self.log)
+        stats = sampler.stats
+        self._count('sampled_rows', stats['rows']); self._count('sample_queries', stats['queries'])
+        self.log(f"数据采样: 读取 {stats['tables']} 张表 {stats['rows']:,} 行，比对 {stats['pairs']:,} 对，"
+                 f"验证查询 {stats['queries']} 次，歧义 {stats['ambiguous']} 列，得到 {len(relations)} 条关系", "INFO")
+        if stats['exhausted']:
+            self.log("⚠️ 采样预算已用尽，结果可能不完整；可调大配置 sampling 中的 time_budget_s / row_budget。", "ERROR")
+        return relations
+
+    def snapshot_for(self, config, cache_dir=None, all_schemas=True):
+        """取得配置所指数据库的完整快照（优先走快照缓存）。
+
+        all_schemas 为真时 PostgreSQL 扫描全部用户Schema；为假时只读默认Schema，与命名推断的范围一致。
+        """
+        engine = self.engine_for(config)
+        schemas = ALL_SCHEMAS if all_schemas and engine.dialect.name == 'postgresql' else None
+        with self._stage("Schema反射", engine):
+            snapshot = self.load_snapshot(engine, config, cache_dir, schemas)
+            if snapshot is None:
+                snapshot = reflect_snapshot(engine, schemas, log=self.log, workers=worker_count(config),
+                                            progress=self._table_progress())
+        self._count('tables', len(snapshot))
+        return snapshot
+
+    def collect_er_model(self, config, cache_dir=None):
+        """返回 (tables, fks)，列信息与外键来自同一次反射（或快照缓存）；多个 Schema 时表名为 "schema.table"。"""
+        self.log("--- 开始生成列级ER图 (SQLAlchemy) ---", "INFO")
+        snapshot = self.snapshot_for(config, cache_dir)
+        return snapshot_er_model(snapshot)
+
+    def save_snapshot(self, config, path=None, cache_dir=None):
+        db_name = output_db_name(config["db_type"], config["database"].get('数据库'))
+        path = path or os.path.join(config["output_path"], f"relation_{db_name}_snapshot.json.gz")
+        snapshot = self.snapshot_for(config, cache_dir)
+        with self._stage("写入快照"):
+            save_snapshot_file(path, snapshot)
+        self._count('files')
+        self.log(f"💾 Schema快照已保存: {path}", "SUCCESS")
+        return path
+
+    def run_diff(self, config, baseline, fmt=None, cache_dir=None, baseline_cache_dir=None):
+        """baseline 为快照文件路径或另一个连接的配置；以 baseline 为旧版本、config 为新版本。"""
+        return self._instrumented(config, "diff",
+                                  lambda: self._run_diff(config, baseline, fmt, cache_dir, baseline_cache_dir))
+
+    def _run_diff(self, config, baseline, fmt, cache_dir, baseline_cache_dir):
+        # 先检查输出格式，避免反射完两个数据库后才报错
+        fmt = fmt or config["output_format"]
+        check_diff_format(fmt)
+        self.log("--- 开始Schema差异对比 ---", "INFO")
+        if isinstance(baseline, str):
+            with self._stage("读取快照"):
+                old, baseline_name = load_snapshot_file(baseline), os.path.basename(baseline)
+        else:
+            old, baseline_name = self.snapshot_for(baseline, baseline_cache_dir), baseline["database"].get('数据库')
+        new = self.snapshot_for(config, cache_dir)
+        with self._stage("差异计算"):
+            diff = diff_snapshots(old, new)
+        label = f"{baseline_name} → {config['database'].get('数据库')} (Diff)"
+        db_name = output_db_name(config["db_type"], config["database"].get('数据库'))
+        output_filename = os.path.join(config["output_path"], f"relation_{db_name}_diff")
+        path = render_diff(diff, config["graph_style"], label, output_filename, fmt,
+                           log=self.log, metrics=self.metrics, cancel=self.cancel_token)
+        self.log(f"🎉 图表已生成: {path}", "SUCCESS")
+        return [path]
+
+    def run_er(self, config, fmt=None, cache_dir=None):
+        fmt = fmt or config["output_format"]
+        tables, fks = self.collect_er_model(config, cache_dir)
+        label, suffix = f"{config['database'].get('数据库')} Schema (ER)", 'er'
+        focus = config["focus"]
+        if focus.get("tables"):
+            with self._stage("聚焦"):
+                index = AdjacencyIndex(fk_relations(fks))
+                seeds = [node for node in map(index.resolve, focus["tables"]) if node]
+                seeds += [t for t in focus["tables"] if t in tables and t not in seeds]
+                nodes = index.neighbourhood(seeds, focus.get("hops", 2), focus.get("direction", 'both'))
+                tables = {t: info for t, info in tables.items() if t in nodes}
+                fks = [fk for fk in fks if fk['table'] in nodes and fk['referred_table'] in nodes]
+            label, suffix = f"{label} - Focus: {', '.join(focus['tables'])}", 'er_focus'
+        self._count('relations', len(fks))
+        db_name = output_db_name(config["db_type"], config["database"].get('数据库'))
+        output_filename = os.path.join(config["output_path"], f"relation_{db_name}_{suffix}")
+        path = render_er(tables, fks, config["graph_style"], label, output_filename, fmt, log=self.log,
+                         metrics=self.metrics, cancel=self.cancel_token)
+        self.log(f"🎉 图表已生成: {path}", "SUCCESS")
+        return [path]
+
+    def restyle(self, style, fmt=None, output_filename=None, dpi=None):
+        """用最近一次保留的关系集按新样式重新出图，不访问数据库；默认覆盖上次的输出文件。"""
+        graph = self._hold_retained("没有可复用的关系图，请先生成一次关系图。")
+
+        def run():
+            path, used = render_retained(graph, style, output_filename or graph.output_filename, fmt or graph.fmt,
+                                         log=self.log, metrics=self.metrics, cancel=self.cancel_token, dpi=dpi)
+            self._adopt(graph, used)
+            return path
+        try:
+            return self._instrumented(graph.config, "restyle", run)
+        finally:
+            graph.release()
+
+    def viewer_layout(self, style):
+        """返回 (plain 格式的布局文本, 本次使用的 RetainedGraph)，供内置查看器使用；可复用上次布局时不重新布局。"""
+        graph = self._hold_retained("没有可查看的关系图，请先生成一次关系图。")
+        try:
+            text, used = layout_plain(graph, style, self.log, cancel=self.cancel_token)
+        finally:
+            graph.release()
+        self._adopt(graph, used)
+        return text, used
+
+    def _adopt(self, graph, used):
+        # 重新布局后保存新的布局；期间若已有新的生成结果则不覆盖。检查与替换在同一把锁内完成
+        if used is graph: return
+        with self._retained_lock:
+            adopted = self.retained.get('graph') is graph
+            if adopted: self.retained['graph'] = used
+        (graph if adopted else used).discard()
+
+    def collect_multi_target_relations(self, config):
+        """返回 {库名: relations}。"""
+        self.log("--- 开始多库并行外键生成 ---", "INFO")
+        if not config["targets"]: raise ValueError("配置文件中未定义 targets，无法进行多库生成。")
+        workers, engines = worker_count(config), {}
+        for i, target in enumerate(config["targets"], 1):
+            name = target.get("name") or target.get("database", {}).get("数据库") or f"db{i}"
+            engines[name] = self.get_engine(target.get("db_type", "MySQL"), target.get("database", {}), workers)
+        self.log(f"并行反射 {len(engines)} 个数据库 (线程数: {workers})...", "INFO")
+
+        def reflect(engine):
+            schemas = ALL_SCHEMAS if engine.dialect.name == 'postgresql' else None
+            with count_queries(engine) as counter:
+                fks = reflect_foreign_keys(engine, schemas=schemas, log=self.log, workers=workers)
+            self._count('queries', counter.count); self._count('tables', len({(fk['schema'], fk['table']) for fk in fks}))
+            return fk_relations(fks)
+        with self._stage("多库外键反射"):
+            results, errors = reflect_targets(engines, reflect, workers=workers, log=self.log,
+                                              progress=self._table_progress())
+        if errors: self.log(f"{len(errors)} 个数据库反射失败: {', '.join(errors)}", "ERROR")
+        return results
+
+    def run(self, config, mode="fk", fmt=None, cache_dir=None):
+        """执行一次完整生成，返回生成的文件路径列表。mode: fk / inference / multi / er / snapshot；
+        fmt 默认取配置中的 output_format。差异对比见 run_diff。"""
+        return self._instrumented(config, mode, lambda: self._run(config, mode, fmt, cache_dir))
+
+    def _run(self, config, mode, fmt, cache_dir):
+        if mode == "er": return self.run_er(config, fmt, cache_dir)
+        if mode == "snapshot": return [self.save_snapshot(config, cache_dir=cache_dir)]
+        style, output_path, fmt = config["graph_style"], config["output_path"], fmt or config["output_format"]
+        db_name = output_db_name(config["db_type"], config["database"].get('数据库'))
+        if mode == "fk":
+            relations = self.collect_fk_relations(self.engine_for(config), config)
+            jobs = [(relations, f"{config['database'].get('数据库')} Schema (FK Based)", db_name, 'fk')]
+        elif mode == "inference":
+            relations = self.collect_inferred_relations(self.engine_for(config), config, cache_dir)
+            jobs = [(relations, f"{config['database'].get('数据库')} Schema (Inferred)", db_name, 'inferred')]
+        elif mode == "multi":
+            results = self.collect_multi_target_relations(config)
+            if config["parallel"].get("merge_mode") == 'per_database':
+                jobs = [(rels, f"{name} Schema (FK Based)", name, 'fk') for name, rels in results.items()]
+            else:
+                jobs = [(merge_target_relations(results), f"{len(results)} Databases (FK Based)", "multi", 'fk')]
+        else:
+            raise ValueError(f"未知的生成模式: {mode}")
+        focus = config["focus"]
+        if focus.get("tables"):
+            # 只把种子表的 k 跳邻域交给 Graphviz，渲染开销取决于邻域大小而不是整个库
+            hops, direction = focus.get("hops", 2), focus.get("direction", 'both')
+            with self._stage("聚焦"):
+                jobs = [(focus_relations(relations, focus["tables"], hops, direction, log=self.log),
+                         f"{label} - Focus: {', '.join(focus['tables'])} ({direction}, {hops} hops)", name,
+                         f"{suffix}_focus") for relations, label, name, suffix in jobs]
+        self._count('relations', sum(len(job[0]) for job in jobs))
+        paths, render_conf = [], config["render"]
+        partitioned = render_conf.get("partition", 'none') != 'none'
+        for relations, label, name, suffix in jobs:
+            output_filename = os.path.join(output_path, f"relation_{name}_{suffix}")
+            try:
+                if self.retain_graph and len(jobs) == 1 and not partitioned:
+                    graph = RetainedGraph(relations, classify_nodes(relations), label, style,
+                                          render_conf.get("large_graph_threshold"), config, output_filename, fmt)
+                    path, graph = render_retained(graph, style, output_filename, fmt, log=self.log,
+                                                  metrics=self.metrics, cancel=self.cancel_token)
+                    self._retain(graph); paths.append(path)
+                elif partitioned:
+                    paths.extend(render_partitioned(relations, style, label, output_filename, fmt, render_conf,
+                                                    log=self.log, metrics=self.metrics, cancel=self.cancel_token))
+                else:
+                    paths.append(render_graph(relations, style, label, output_filename, fmt, log=self.log,
+                                              threshold=render_conf.get("large_graph_threshold"),
+                                              metrics=self.metrics, cancel=self.cancel_token))
+            except NoRelationsError:
+                # 多库单独出图时，某个库没有关系不影响其余库
+                if len(jobs) == 1: raise
+                self.log(f"⚠️ {name} 未找到任何关系，已跳过。", "ERROR"); continue
+            self.log(f"🎉 图表已生成: {paths[-1]}", "SUCCESS")
+        if not paths: raise NoRelationsError("未能找到任何表间关系。")
+        return paths
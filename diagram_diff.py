@@ -0,0 +1,56 @@
+from diagram_cache import snapshot_er_model, snapshot_schemas
+from diagram_reflection import fk_relations
+
+# --- Schema 差异对比 ---
+# 比较两份快照（两个连接，或在线库与保存的快照文件），只保留发生变化的表、变化的外键以及它们的直接邻居
+
+
+def _column_map(info):
+    return {name: (col_type, nullable) for name, col_type, nullable in info['columns']}
+
+
+def diff_snapshots(old, new):
+    """返回差异字典；表名集合与外键边集合都用集合运算求差。任一侧含多个 Schema 时两侧都按 "schema.table" 比较。"""
+    qualify = len(snapshot_schemas(old) | snapshot_schemas(new)) > 1
+    (old_tables, old_fks), (new_tables, new_fks) = snapshot_er_model(old, qualify), snapshot_er_model(new, qualify)
+    old_edges, new_edges = fk_relations(old_fks), fk_relations(new_fks)
+    old_names, new_names = set(old_tables), set(new_tables)
+    changed = {}
+    for table in old_names & new_names:
+        before, after = _column_map(old_tables[table]), _column_map(new_tables[table])
+        added_cols, removed_cols = set(after) - set(before), set(before) - set(after)
+        altered_cols = {c for c in set(before) & set(after) if before[c] != after[c]}
+        pk_changed = list(old_tables[table]['pks']) != list(new_tables[table]['pks'])
+        if added_cols or removed_cols or altered_cols or pk_changed:
+            changed[table] = {'added_columns': sorted(added_cols), 'removed_columns': sorted(removed_cols),
+                              'altered_columns': sorted(altered_cols), 'pk_changed': pk_changed}
+    return {'added_tables': sorted(new_names - old_names), 'removed_tables': sorted(old_names - new_names),
+            'changed_tables': changed, 'added_edges': sorted(new_edges - old_edges),
+            'removed_edges': sorted(old_edges - new_edges), 'old_edges': old_edges, 'new_edges': new_edges}
+
+
+def has_changes(diff):
+    return any(diff[k] for k in ('added_tables', 'removed_tables', 'changed_tables', 'added_edges', 'removed_edges'))
+
+
+def diff_graph(diff):
+    """返回 (node_status, edges)。node_status: {表: added/removed/changed/context}，
+    edges: [(from, to, added/removed/unchanged)]，只包含变化的节点及其一跳邻居。"""
+    status = {t: 'added' for t in diff['added_tables']}
+    status.update({t: 'removed' for t in diff['removed_tables']})
+    status.update({t: 'changed' for t in diff['changed_tables']})
+    core = set(status) | {n for edge in diff['added_edges'] + diff['removed_edges'] for n in edge}
+    added_edges, removed_edges = set(diff['added_edges']), set(diff['removed_edges'])
+    edges = []
+    for f, t in sorted(diff['old_edges'] | diff['new_edges']):
+        if f not in core and t not in core: continue
+        kind = 'added' if (f, t) in added_edges else 'removed' if (f, t) in removed_edges else 'unchanged'
+        edges.append((f, t, kind))
+        for node in (f, t): status.setdefault(node, 'context')
+    return status, edges
+
+
+def diff_summary(diff):
+    return (f"新增表 {len(diff['added_tables'])}，删除表 {len(diff['removed_tables'])}，"
+            f"修改表 {len(diff['changed_tables'])}，新增外键 {len(diff['added_edges'])}，"
+            f"删除外键 {len(diff['removed_edges'])}")
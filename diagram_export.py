@@ -0,0 +1,295 @@
+import html
+import json
+import re
+
+# --- 纯 Python 的文本格式导出 ---
+# 这些格式不需要 Graphviz 可执行文件，逐行生成并直接写入磁盘
+TEXT_FORMATS = {'dot': 'gv', 'mermaid': 'mmd', 'plantuml': 'puml', 'json': 'json'}
+
+
+def dot_escape(value):
+    # 先转义反斜杠，否则以 \ 结尾的名称会吞掉结束引号；换行写成 \n，避免字符串跨行
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\r', '').replace('\n', '\\n')
+
+
+def dot_quote(value):
+    return '"' + dot_escape(value) + '"'
+
+
+def _dot_attrs(attrs):
+    return ", ".join(f"{k}={dot_quote(v)}" for k, v in attrs.items())
+
+
+def dot_attributes(style, label, splines=None, engine="dot"):
+    """返回 (graph_attrs, node_attrs, edge_attrs)，与原先 Digraph 使用的属性一致。"""
+    graph_attrs = {'rankdir': style['layout'], 'bgcolor': style['bg_color'], 'pad': '1.0',
+                   'splines': splines or style['spline'], 'nodesep': '0.8', 'ranksep': '1.2', 'label': f"\n{label}",
+                   'fontsize': '22', 'fontname': 'Segoe UI,Verdana,Arial', 'fontcolor': '#333333',
+                   'overlap': 'false'}
+    if engine != 'dot': graph_attrs.update({'overlap': 'prism', 'outputorder': 'edgesfirst'})
+    node_attrs = {'style': 'filled,rounded', 'shape': 'box', 'fontname': 'Segoe UI,Verdana,Arial', 'fontsize': '14',
+                  'fontcolor': '#2D2D2D', 'margin': '0.4', 'color': '#666666'}
+    edge_attrs = {'color': '#757575', 'arrowsize': '0.9', 'penwidth': '1.5'}
+    return graph_attrs, node_attrs, edge_attrs
+
+
+def iter_dot(relations, kinds, style, label, splines=None, engine="dot", stubs=()):
+    graph_attrs, node_attrs, edge_attrs = dot_attributes(style, label, splines, engine)
+    yield "digraph {\n"
+    yield f"\tgraph [{_dot_attrs(graph_attrs)}]\n"
+    yield f"\tnode [{_dot_attrs(node_attrs)}]\n"
+    yield f"\tedge [{_dot_attrs(edge_attrs)}]\n"
+    for node, kind in kinds.items():
+        if node in stubs:
+            yield f"\t{dot_quote(node)} [fillcolor=\"#FFFFFF\", style=\"dashed,rounded\", fontcolor=\"#888888\"]\n"
+        else:
+            yield f"\t{dot_quote(node)} [fillcolor={dot_quote(style[f'node_color_{kind}'])}]\n"
+    for f, t in relations:
+        yield f"\t{dot_quote(f)} -> {dot_quote(t)}\n"
+    yield "}\n"
+
+
+_MERMAID_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_-]*')
+
+
+def _mermaid_label(name):
+    return '"' + name.replace('"', '#quot;') + '"'
+
+
+def _mermaid_aliases(names, prefix="t"):
+    """表名 (或列名) -> Mermaid 名称。只含 ASCII 标识符字符的名称原样使用；其余 (如中文表名) 分配唯一别名 tN，
+    真实名称通过 alias["名称"] 声明显示，避免不同表名替换字符后重名。"""
+    names = list(names)
+    safe = {n for n in names if _MERMAID_NAME.fullmatch(n)}
+    aliases, i = {}, 0
+    for name in names:
+        if name in safe:
+            aliases[name] = name; continue
+        i += 1
+        while f"{prefix}{i}" in safe: i += 1
+        aliases[name] = f"{prefix}{i}"
+    return aliases
+
+
+def _mermaid_entity(name, aliases):
+    alias = aliases[name]
+    return alias if alias == name else f"{alias}[{_mermaid_label(name)}]"
+
+
+def iter_mermaid(relations, kinds, style, label, **_):
+    aliases = _mermaid_aliases(kinds)
+    yield f"---\ntitle: {json.dumps(label, ensure_ascii=False)}\n---\nerDiagram\n"
+    # 每个节点都出现在某条关系中，只需为使用别名的实体声明显示名称
+    for node in kinds:
+        if aliases[node] != node: yield f"    {_mermaid_entity(node, aliases)}\n"
+    for f, t in relations:
+        yield f"    {aliases[f]} }}o--|| {aliases[t]} : \"FK\"\n"
+
+
+def iter_plantuml(relations, kinds, style, label, stubs=(), **_):
+    aliases = {node: f"e{i}" for i, node in enumerate(kinds, 1)}
+    yield f"@startuml\ntitle {label}\nhide circle\nskinparam linetype ortho\n"
+    for node, kind in kinds.items():
+        color = '#FFFFFF' if node in stubs else style[f'node_color_{kind}']
+        yield f"entity \"{node}\" as {aliases[node]} {color}\n"
+    for f, t in relations:
+        yield f"{aliases[f]} }}o--|| {aliases[t]}\n"
+    yield "@enduml\n"
+
+
+def iter_json(relations, kinds, style, label, stubs=(), **_):
+    # 手工拼接外层结构，逐个元素序列化，避免先在内存中构造整个对象
+    yield f'{{"label": {json.dumps(label, ensure_ascii=False)},\n "nodes": ['
+    for i, (node, kind) in enumerate(kinds.items()):
+        item = {'name': node, 'kind': 'stub' if node in stubs else kind}
+        yield ("" if i == 0 else ",") + "\n  " + json.dumps(item, ensure_ascii=False)
+    yield "\n ],\n \"edges\": ["
+    for i, (f, t) in enumerate(relations):
+        yield ("" if i == 0 else ",") + "\n  " + json.dumps({'from': f, 'to': t}, ensure_ascii=False)
+    yield "\n ]\n}\n"
+
+
+_WRITERS = {'dot': iter_dot, 'mermaid': iter_mermaid, 'plantuml': iter_plantuml, 'json': iter_json}
+
+
+# --- 列级 ER 图 ---
+# tables: {表名: {'columns': [[列名, 类型, 可空]], 'pks': [主键列]}}；fks 为反射得到的完整外键字典列表
+def _fk_columns(fks):
+    result = {}
+    for fk in fks: result.setdefault(fk['table'], set()).update(fk['constrained_columns'])
+    return result
+
+
+def _column_marker(name, pks, fk_cols):
+    return ",".join(m for m, hit in (("PK", name in pks), ("FK", name in fk_cols)) if hit)
+
+
+_MARKER_CELLS = {(pk, fk): (f'<FONT COLOR="#B8860B">{",".join(m for m, hit in (("PK", pk), ("FK", fk)) if hit)}</FONT>'
+                            if pk or fk else '') for pk in (False, True) for fk in (False, True)}
+
+
+def iter_er_dot(tables, fks, kinds, style, label, splines=None, engine="dot"):
+    """HTML-like 表格标签，每列一个 PORT，外键连线从子表列指向父表列。整张图用字符串拼接生成。"""
+    # ortho 连线不支持端口，ER 图中退化为 spline
+    spline = splines or style['spline']
+    graph_attrs, _, edge_attrs = dot_attributes(style, label, 'spline' if spline == 'ortho' else spline, engine)
+    node_attrs = {'shape': 'plain', 'fontname': 'Segoe UI,Verdana,Arial', 'fontsize': '12', 'fontcolor': '#2D2D2D'}
+    yield "digraph {\n"
+    yield f"\tgraph [{_dot_attrs(graph_attrs)}]\n"
+    yield f"\tnode [{_dot_attrs(node_attrs)}]\n"
+    yield f"\tedge [{_dot_attrs(edge_attrs)}]\n"
+    # 类型字符串大量重复，转义结果做缓存
+    fk_cols, ports, escaped = _fk_columns(fks), {}, {}
+
+    def esc(text):
+        value = escaped.get(text)
+        if value is None: value = escaped[text] = html.escape(text)
+        return value
+    for table, info in tables.items():
+        pks, table_fk_cols = set(info['pks']), fk_cols.get(table, ())
+        color = style[f"node_color_{kinds.get(table, 'default')}"]
+        parts = ['<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="4" COLOR="#666666" BGCOLOR="#FFFFFF">',
+                 f'<TR><TD COLSPAN="3" BGCOLOR="{color}"><B>{esc(table)}</B></TD></TR>']
+        for i, (name, col_type, nullable) in enumerate(info['columns']):
+            ports[(table, name)] = f"p{i}"
+            in_pk, in_fk = name in pks, name in table_fk_cols
+            name_cell = f"<B>{esc(name)}</B>" if in_pk else esc(name)
+            marker_cell = _MARKER_CELLS[in_pk, in_fk]
+            parts.append(f'<TR><TD ALIGN="LEFT">{marker_cell}</TD>'
+                         f'<TD ALIGN="LEFT" PORT="p{i}">{name_cell}</TD>'
+                         f'<TD ALIGN="LEFT"><FONT COLOR="#777777">{esc(col_type)}{"" if nullable else " NOT NULL"}'
+                         f'</FONT></TD></TR>')
+        parts.append('</TABLE>>')
+        yield f"\t{dot_quote(table)} [label={''.join(parts)}]\n"
+    for fk in fks:
+        src, dst = fk['table'], fk['referred_table']
+        if src not in tables or dst not in tables: continue
+        src_port = ports.get((src, fk['constrained_columns'][0]))
+        dst_port = ports.get((dst, (fk['referred_columns'] or [None])[0]))
+        src_ref = f"{dot_quote(src)}:{src_port}" if src_port else dot_quote(src)
+        dst_ref = f"{dot_quote(dst)}:{dst_port}" if dst_port else dot_quote(dst)
+        yield f"\t{src_ref} -> {dst_ref}\n"
+    yield "}\n"
+
+
+def _mermaid_type(col_type):
+    return re.sub(r'[^A-Za-z0-9_()\[\]-]', '_', col_type) or 'UNKNOWN'
+
+
+def iter_er_mermaid(tables, fks, kinds, style, label, **_):
+    fk_cols, aliases = _fk_columns(fks), _mermaid_aliases(tables)
+    yield f"---\ntitle: {json.dumps(label, ensure_ascii=False)}\n---\nerDiagram\n"
+    for table, info in tables.items():
+        pks, table_fk_cols = set(info['pks']), fk_cols.get(table, ())
+        yield f"    {_mermaid_entity(table, aliases)} {{\n"
+        columns = _mermaid_aliases((name for name, _, _ in info['columns']), prefix="c")
+        for name, col_type, _nullable in info['columns']:
+            marker = _column_marker(name, pks, table_fk_cols)
+            # 属性名只能用 ASCII 字符，使用别名时把真实列名写在注释中
+            comment = f" {_mermaid_label(name)}" if columns[name] != name else ""
+            yield f"        {_mermaid_type(col_type)} {columns[name]}{' ' + marker if marker else ''}{comment}\n"
+        yield "    }\n"
+    for fk in fks:
+        if fk['table'] in tables and fk['referred_table'] in tables:
+            yield (f"    {aliases[fk['table']]} }}o--|| {aliases[fk['referred_table']]} : "
+                   f"\"{'_'.join(fk['constrained_columns'])}\"\n")
+
+
+def iter_er_plantuml(tables, fks, kinds, style, label, **_):
+    fk_cols, aliases = _fk_columns(fks), {table: f"e{i}" for i, table in enumerate(tables, 1)}
+    yield f"@startuml\ntitle {label}\nhide circle\nskinparam linetype ortho\n"
+    for table, info in tables.items():
+        pks, table_fk_cols = set(info['pks']), fk_cols.get(table, ())
+        color = style[f"node_color_{kinds.get(table, 'default')}"]
+        yield f"entity \"{table}\" as {aliases[table]} {color} {{\n"
+        for name, col_type, nullable in info['columns']:
+            marker = _column_marker(name, pks, table_fk_cols)
+            yield f"  {'*' if not nullable else ''}{name} : {col_type}{' <<' + marker + '>>' if marker else ''}\n"
+        yield "}\n"
+    for fk in fks:
+        if fk['table'] in aliases and fk['referred_table'] in aliases:
+            yield f"{aliases[fk['table']]} }}o--|| {aliases[fk['referred_table']]}\n"
+    yield "@enduml\n"
+
+
+def iter_er_json(tables, fks, kinds, style, label, **_):
+    yield f'{{"label": {json.dumps(label, ensure_ascii=False)},\n "tables": ['
+    for i, (table, info) in enumerate(tables.items()):
+        item = {'name': table, 'kind': kinds.get(table, 'default'), 'pks': info['pks'],
+                'columns': [{'name': n, 'type': t, 'nullable': nl} for n, t, nl in info['columns']]}
+        yield ("" if i == 0 else ",") + "\n  " + json.dumps(item, ensure_ascii=False)
+    yield "\n ],\n \"foreign_keys\": ["
+    for i, fk in enumerate(fks):
+        item = {k: fk[k] for k in ('table', 'constrained_columns', 'referred_table', 'referred_columns')}
+        yield ("" if i == 0 else ",") + "\n  " + json.dumps(item, ensure_ascii=False)
+    yield "\n ]\n}\n"
+
+
+# --- Schema 差异图 ---
+_DIFF_EDGE_ATTRS = {'added': '[color="#2E7D32", penwidth="2.5"]', 'removed': '[color="#C62828", style="dashed", '
+                    'penwidth="2.5"]', 'unchanged': '[color="#B0B0B0"]'}
+
+
+def _diff_node_label(table, change):
+    # \l 为 Graphviz 的左对齐换行转义；返回已转义的 DOT 字符串，表名与列名单独转义
+    lines = [f"+ {c}" for c in change['added_columns']] + [f"- {c}" for c in change['removed_columns']]
+    lines += [f"~ {c}" for c in change['altered_columns']] + (["~ (主键)"] if change['pk_changed'] else [])
+    return dot_escape(table) + ("\\n" + "".join(f"{dot_escape(line)}\\l" for line in lines) if lines else "")
+
+
+def iter_diff_dot(status, edges, diff, style, label):
+    graph_attrs, node_attrs, edge_attrs = dot_attributes(style, label)
+    yield "digraph {\n"
+    yield f"\tgraph [{_dot_attrs(graph_attrs)}]\n"
+    yield f"\tnode [{_dot_attrs(node_attrs)}]\n"
+    yield f"\tedge [{_dot_attrs(edge_attrs)}]\n"
+    for table, kind in sorted(status.items()):
+        color = style['node_color_default'] if kind == 'context' else style[f'node_color_{kind}']
+        extra = ', style="filled,rounded,dashed"' if kind == 'removed' else ''
+        node_label = _diff_node_label(table, diff['changed_tables'][table]) if kind == 'changed' else dot_escape(table)
+        yield f"\t{dot_quote(table)} [label=\"{node_label}\", fillcolor={dot_quote(color)}{extra}]\n"
+    for f, t, kind in edges:
+        yield f"\t{dot_quote(f)} -> {dot_quote(t)} {_DIFF_EDGE_ATTRS[kind]}\n"
+    yield "}\n"
+
+
+def iter_diff_json(status, edges, diff, style, label):
+    report = {k: v for k, v in diff.items() if k not in ('old_edges', 'new_edges')}
+    report['label'] = label
+    yield json.dumps(report, ensure_ascii=False, indent=1)
+    yield "\n"
+
+
+_ER_WRITERS = {'dot': iter_er_dot, 'mermaid': iter_er_mermaid, 'plantuml': iter_er_plantuml, 'json': iter_er_json}
+
+
+def export_text(relations, kinds, style, label, output_filename, fmt, stubs=()):
+    """把关系图写成文本格式，返回文件路径。output_filename 不含扩展名。
+
+    按传入顺序逐行写出，不复制或排序节点与边集合：节点顺序为 kinds 的迭代顺序 (NodeKinds 为首次出现的顺序)，
+    边顺序为 relations 的迭代顺序。relations 为集合时，同一进程内的输出稳定，但不同进程之间顺序可能不同。
+    """
+    path = f"{output_filename}.{TEXT_FORMATS[fmt]}"
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.writelines(_WRITERS[fmt](relations, kinds, style, label, stubs=stubs))
+    return path
+
+
+def export_er_text(tables, fks, kinds, style, label, output_filename, fmt):
+    """表按 tables 的顺序 (快照中的反射顺序) 写出，外键按 fks 的顺序，不另行排序。"""
+    path = f"{output_filename}.{TEXT_FORMATS[fmt]}"
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.writelines(_ER_WRITERS[fmt](tables, fks, kinds, style, label))
+    return path
+
+
+_DIFF_WRITERS = {'dot': iter_diff_dot, 'json': iter_diff_json}
+DIFF_TEXT_FORMATS = tuple(_DIFF_WRITERS)
+
+
+def export_diff_text(status, edges, diff, style, label, output_filename, fmt):
+    if fmt not in _DIFF_WRITERS: raise ValueError(f"差异模式不支持 {fmt} 格式，请使用 png/svg/pdf/dot/json。")
+    path = f"{output_filename}.{TEXT_FORMATS[fmt]}"
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.writelines(_DIFF_WRITERS[fmt](status, edges, diff, style, label))
+    return path
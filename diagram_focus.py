@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+# --- 聚焦模式：以若干张表为中心提取 k 跳邻域 ---
+# 方向: referencing = 引用种子表的表 (沿外键反向)，referenced = 种子表引用的表 (沿外键正向)，both = 两者
+FOCUS_DIRECTIONS = ('both', 'referencing', 'referenced')
+
+
+def get_default_focus_settings():
+    return {'tables': [], 'hops': 2, 'direction': 'both'}
+
+
+def parse_table_list(text):
+    return [t.strip() for t in text.replace('，', ',').split(',') if t.strip()]
+
+
+class AdjacencyIndex:
+    """由关系集合一次性构建的出/入邻接表，之后每次邻域提取只访问邻域内的节点。"""
+
+    def __init__(self, relations):
+        self.out_edges, self.in_edges = defaultdict(set), defaultdict(set)
+        self._lookup = {}
+        for f, t in relations:
+            self.out_edges[f].add(t); self.in_edges[t].add(f)
+        for node in set(self.out_edges) | set(self.in_edges):
+            # 大小写不敏感；"schema.table" 也可以只用表名查找
+            self._lookup.setdefault(node.lower(), node)
+            self._lookup.setdefault(node.rsplit('.', 1)[-1].lower(), node)
+
+    def resolve(self, name):
+        return self._lookup.get(name.lower())
+
+    def neighbourhood(self, seeds, hops=2, direction='both'):
+        """广度优先扩展 hops 跳，返回邻域内的节点集合。"""
+        if direction not in FOCUS_DIRECTIONS: raise ValueError(f"未知的聚焦方向: {direction}")
+        visited, frontier = set(seeds), set(seeds)
+        for _ in range(max(0, int(hops))):
+            nxt = set()
+            for node in frontier:
+                if direction in ('both', 'referenced'): nxt |= self.out_edges.get(node, set())
+                if direction in ('both', 'referencing'): nxt |= self.in_edges.get(node, set())
+            frontier = nxt - visited
+            if not frontier: break
+            visited |= frontier
+        return visited
+
+    def subgraph(self, nodes):
+        return {(f, t) for f in nodes for t in self.out_edges.get(f, ()) if t in nodes}
+
+
+def focus_relations(relations, tables, hops=2, direction='both', log=None):
+    """返回以 tables 为种子的 k 跳子图关系集合。"""
+    index = AdjacencyIndex(relations)
+    seeds, missing = [], []
+    for name in tables:
+        node = index.resolve(name)
+        if node is None: missing.append(name)
+        else: seeds.append(node)
+    if missing and log: log(f"⚠️ 以下聚焦表没有任何关系或不存在: {', '.join(missing)}", "ERROR")
+    if not seeds: return set()
+    nodes = index.neighbourhood(seeds, hops, direction)
+    sub = index.subgraph(nodes)
+    if log: log(f"聚焦 {', '.join(seeds)} ({direction}, {hops} 跳): {len(nodes)} 张表，{len(sub)} 条关系", "INFO")
+    return sub
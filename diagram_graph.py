@@ -0,0 +1,47 @@
+from array import array
+from collections.abc import Mapping
+
+# --- 紧凑的节点分类 ---
+# 分类编码 = (有出边) | (有入边) << 1
+KINDS = ('default', 'start', 'end', 'link')
+
+
+class NodeKinds(Mapping):
+    """表名 -> 节点分类 (start / link / end / default) 的只读映射，由关系集合一次遍历构建。
+
+    表名按首次出现的顺序驻留为整数 id，出入度保存在两个 array 中；
+    不再为每个节点分别建立出度、入度与分类字典，几十万条外键时内存占用仍然很小。
+    """
+
+    def __init__(self, relations=()):
+        ids, names = {}, []
+        out_d, in_d = array('L'), array('L')
+        for f, t in relations:
+            fi = ids.get(f)
+            if fi is None:
+                fi = ids[f] = len(names); names.append(f); out_d.append(0); in_d.append(0)
+            ti = ids.get(t)
+            if ti is None:
+                ti = ids[t] = len(names); names.append(t); out_d.append(0); in_d.append(0)
+            out_d[fi] += 1; in_d[ti] += 1
+        self._ids, self._names, self._out, self._in = ids, names, out_d, in_d
+
+    def _kind(self, i):
+        return KINDS[(self._out[i] > 0) | (self._in[i] > 0) << 1]
+
+    def __getitem__(self, name):
+        return self._kind(self._ids[name])
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def degree(self, name):
+        """返回 (出度, 入度)。"""
+        i = self._ids[name]
+        return self._out[i], self._in[i]
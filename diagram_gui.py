@@ -0,0 +1,845 @@
+import sv_ttk
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog, colorchooser
+import math
+import os
+import tempfile
+import time
+import webbrowser
+import json
+import sys
+from itertools import groupby
+
+# 【修正】引入SQLAlchemy。ImportError是Python内置异常，无需从sqlalchemy.exc导入。
+from sqlalchemy.exc import SQLAlchemyError
+
+from diagram_core import (CONFIG_FILE_NAME, OUTPUT_FORMATS, DiagramPipeline, NoRelationsError, RenderError, cache_dir_for,
+                          get_default_styles, get_default_cache_settings, get_default_parallel_settings,
+                          load_config, merge_config, quiet_log)
+from diagram_focus import get_default_focus_settings, parse_table_list
+from diagram_inference import get_default_inference_settings
+from diagram_jobs import JOB_STATUSES, JobCancelledError, JobExecutor
+from diagram_logging import LogQueue, get_default_log_settings
+from diagram_metrics import get_default_diagnostics_settings
+from diagram_partition import get_default_render_settings
+from diagram_reflection import DB_DIALECT_MAP
+from diagram_sampling import get_default_sampling_settings
+from diagram_viewer import DiagramViewer, ViewerModel
+
+# 样式预览图的分辨率，降低后绘制与加载都更快
+PREVIEW_DPI = 48
+
+
+# --- 辅助类：鼠标悬停提示 (不变) ---
+class ToolTip:
+    def __init__(self, widget, text):
+        self.widget = widget
+        self.text = text
+        self.tooltip = None
+        self.widget.bind("<Enter>", self.show_tip)
+        self.widget.bind("<Leave>", self.hide_tip)
+
+    def show_tip(self, event=None):
+        x, y, _, _ = self.widget.bbox("insert")
+        x += self.widget.winfo_rootx() + 25
+        y += self.widget.winfo_rooty() + 25
+        self.tooltip = tk.Toplevel(self.widget)
+        self.tooltip.wm_overrideredirect(True)
+        self.tooltip.wm_geometry(f"+{x}+{y}")
+        label = tk.Label(self.tooltip, text=self.text, background="#FFFFE0", relief="solid", borderwidth=1,
+                         font=("tahoma", "8", "normal"))
+        label.pack(ipadx=1)
+
+    def hide_tip(self, event=None):
+        if self.tooltip: self.tooltip.destroy()
+        self.tooltip = None
+
+
+# --- 主应用 ---
+class UltimateBeautifiedApp(tk.Tk):
+
+    def __init__(self):
+        super().__init__()
+        self.title("数据库关系图生成器")
+        self.geometry("700x900")
+
+        # --- 数据模型 ---
+        self.db_entries = {}
+        self.output_path = tk.StringVar()
+        self.output_format = tk.StringVar(value="png")
+        self.last_generated_file = None
+        self.config_file_path = tk.StringVar()
+        self.db_type = tk.StringVar()
+        self.schema_cache_conf = get_default_cache_settings()
+        self.inference_conf = get_default_inference_settings()
+        self.parallel_workers = tk.IntVar(value=4)
+        self.merge_mode = tk.StringVar()
+        self.targets = []
+        self.render_conf = get_default_render_settings()
+        self.partition_mode = tk.StringVar()
+        self.large_graph_threshold = tk.IntVar(value=self.render_conf['large_graph_threshold'])
+        self.focus_tables = tk.StringVar()
+        self.focus_hops = tk.IntVar(value=get_default_focus_settings()['hops'])
+        self.focus_direction = tk.StringVar(value=get_default_focus_settings()['direction'])
+        self.diagnostics_conf = get_default_diagnostics_settings()
+        self.profile_enabled = tk.BooleanVar(value=self.diagnostics_conf['profile'])
+        self.sampling_conf = get_default_sampling_settings()
+        self.sampling_enabled = tk.BooleanVar(value=self.sampling_conf['enabled'])
+        self.sampling_time_budget = tk.IntVar(value=self.sampling_conf['time_budget_s'])
+        self.sampling_row_budget = tk.IntVar(value=self.sampling_conf['row_budget'])
+        self._last_progress_time = 0.0
+        # 日志先进入队列，由界面线程定时批量写入文本框
+        self.log_conf = get_default_log_settings()
+        self.log_file_path = tk.StringVar()
+        self.log_queue = LogQueue(self.log_conf['max_lines'])
+        self._log_job = None
+        self.parallel_jobs = get_default_parallel_settings()['jobs']
+        self._jobs_dirty, self._closing = False, False
+        # 样式预览：只改样式时复用上次生成保留的关系集与布局，不重新读取数据库
+        self._preview_after, self._preview_image = None, None
+        self.preview_path = os.path.join(tempfile.gettempdir(), f"relationship_diagram_preview_{os.getpid()}")
+        # 内置查看器当前显示的 (关系图, 布局方向, 连线样式)，不变时切换标签页不重新加载
+        self._viewer_key = None
+
+        self.db_dialect_map = DB_DIALECT_MAP
+        self.graph_style = {'layout': tk.StringVar(), 'spline': tk.StringVar(), 'bg_color': tk.StringVar(),
+                            'node_color_default': tk.StringVar(), 'node_color_start': tk.StringVar(),
+                            'node_color_link': tk.StringVar(), 'node_color_end': tk.StringVar(),
+                            'node_color_added': tk.StringVar(), 'node_color_removed': tk.StringVar(),
+                            'node_color_changed': tk.StringVar()}
+        self.layout_map = {'从上到下 (TB)': 'TB', '从左到右 (LR)': 'LR'}
+        self.spline_map = {'直角连线 (ortho)': 'ortho', '曲线 (curved)': 'curved', '样条曲线 (spline)': 'spline'}
+        self.layout_map_rev = {v: k for k, v in self.layout_map.items()}
+        self.spline_map_rev = {v: k for k, v in self.spline_map.items()}
+        self.merge_mode_map = {'合并为一张图': 'combined', '每个库单独出图': 'per_database'}
+        self.merge_mode_map_rev = {v: k for k, v in self.merge_mode_map.items()}
+        self.partition_map = {'不拆分': 'none', '按连通分量': 'component', '按Schema': 'schema', '按表名前缀': 'prefix'}
+        self.partition_map_rev = {v: k for k, v in self.partition_map.items()}
+        self.direction_map = {'双向': 'both', '引用它的表': 'referencing', '它引用的表': 'referenced'}
+        self.direction_map_rev = {v: k for k, v in self.direction_map.items()}
+
+        sv_ttk.set_theme("light")
+        self._create_widgets()
+        self.pipeline = DiagramPipeline(log=self._log, progress=self._progress, retain_graph=True)
+
+        # 判断程序是否被打包 (frozen)
+        if getattr(sys, 'frozen', False):
+            # 如果是打包后的EXE文件，则获取EXE文件所在的目录
+            application_path = os.path.dirname(sys.executable)
+        else:
+            # 如果是直接运行的.py脚本，则获取脚本所在的目录
+            application_path = os.path.dirname(os.path.abspath(__file__))
+
+        # 将默认配置文件路径设置在程序所在目录下
+        default_config_path = os.path.join(application_path, CONFIG_FILE_NAME)
+        self.config_file_path.set(default_config_path)
+        self._load_config()
+        # 任务在固定大小的线程池中排队执行；并发数在启动时读取配置，共享的连接池按并发数放大
+        self.pipeline.jobs = self.parallel_jobs
+        self.executor = JobExecutor(workers=self.parallel_jobs, on_change=self._on_job_changed)
+        self.preview_executor = JobExecutor(workers=1, history=1)
+        self._log_job = self.after(self.log_conf['flush_interval_ms'], self._drain_log)
+
+        self.protocol("WM_DELETE_WINDOW", self._on_closing)
+
+    # --- 1. 配置持久化 ---
+    def _load_config(self, filepath=None):
+        target_path = filepath or self.config_file_path.get()
+        self._log(f"正在从 {os.path.basename(target_path)} 加载配置...", "INFO")
+        try:
+            with open(target_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            self.config_file_path.set(target_path)
+            self.db_type.set(config.get("db_type", "MySQL"))
+            db_conf = config.get("database", {})
+            for key, entry in self.db_entries.items():
+                if key != "密码": entry.delete(0, tk.END); entry.insert(0, db_conf.get(key, ''))
+            self.output_path.set(config.get("output_path", os.getcwd()))
+            self.output_format.set(config.get("output_format", "png"))
+            style_conf = config.get("graph_style", {})
+            for key, var in self.graph_style.items(): var.set(style_conf.get(key, get_default_styles()[key]))
+            self.schema_cache_conf = {**get_default_cache_settings(), **config.get("schema_cache", {})}
+            self.inference_conf = {**get_default_inference_settings(), **config.get("inference", {})}
+            parallel_conf = {**get_default_parallel_settings(), **config.get("parallel", {})}
+            self.parallel_workers.set(parallel_conf['workers']); self.merge_mode.set(parallel_conf['merge_mode'])
+            self.parallel_jobs = parallel_conf['jobs']
+            self.targets = config.get("targets", [])
+            self.render_conf = {**get_default_render_settings(), **config.get("render", {})}
+            self.partition_mode.set(self.render_conf['partition'])
+            self.large_graph_threshold.set(self.render_conf['large_graph_threshold'])
+            focus_conf = {**get_default_focus_settings(), **config.get("focus", {})}
+            self.focus_tables.set(", ".join(focus_conf['tables'])); self.focus_hops.set(focus_conf['hops'])
+            self.focus_direction.set(focus_conf['direction'])
+            self.diagnostics_conf = {**get_default_diagnostics_settings(), **config.get("diagnostics", {})}
+            self.profile_enabled.set(bool(self.diagnostics_conf['profile']))
+            self.sampling_conf = {**get_default_sampling_settings(), **config.get("sampling", {})}
+            self.sampling_enabled.set(bool(self.sampling_conf['enabled']))
+            self.sampling_time_budget.set(self.sampling_conf['time_budget_s'])
+            self.sampling_row_budget.set(self.sampling_conf['row_budget'])
+            self.log_conf = {**get_default_log_settings(), **config.get("logging", {})}
+            self.log_file_path.set(self.log_conf['file']); self._apply_log_settings()
+            self._log("✅ 配置加载成功!", "SUCCESS")
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._log(f"未找到或配置文件无效，使用默认设置。", "INFO")
+            if not filepath:
+                self.output_path.set(os.getcwd());
+                self.db_type.set("MySQL")
+                default_styles = get_default_styles()
+                for key, var in self.graph_style.items(): var.set(default_styles[key])
+                self.merge_mode.set(get_default_parallel_settings()['merge_mode'])
+                self.partition_mode.set(get_default_render_settings()['partition'])
+            else:
+                self.after(0, lambda: messagebox.showwarning("加载失败", f"无法加载或解析文件：\n{target_path}"))
+        self.after(0, self._update_ui_from_style_vars);
+        self.after(0, self._on_db_type_changed)
+
+    def _save_config(self, filepath=None):
+        target_path = filepath or self.config_file_path.get()
+        if not target_path: self._log("配置文件路径为空，无法保存。", "ERROR"); return
+        self._log(f"正在保存配置到 {os.path.basename(target_path)}...", "INFO")
+        config = self._collect_config()
+        try:
+            with open(target_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=4, ensure_ascii=False)
+            self.config_file_path.set(target_path)
+            self._log("✅ 配置已保存。", "SUCCESS")
+        except Exception as e:
+            self._log(f"保存配置失败: {e}", "ERROR"); self.after(0, lambda: messagebox.showerror("保存失败",
+                                                                                                 f"无法保存配置文件到：\n{target_path}\n\n错误: {e}"))
+
+    def _collect_config(self, include_password=False):
+        # 与配置文件结构一致；密码默认不写入文件，只在生成时带上
+        db_conf = {key: entry.get() for key, entry in self.db_entries.items() if include_password or key != "密码"}
+        return {"db_type": self.db_type.get(), "database": db_conf, "output_path": self.output_path.get(),
+                "output_format": self.output_format.get() or "png",
+                "graph_style": {key: var.get() for key, var in self.graph_style.items()},
+                "schema_cache": self.schema_cache_conf, "inference": self.inference_conf,
+                "parallel": {"workers": self._get_worker_count(), "merge_mode": self.merge_mode.get(),
+                             "jobs": self.parallel_jobs},
+                "render": {**self.render_conf, "partition": self.partition_mode.get() or 'none',
+                           "large_graph_threshold": self._get_int_var(self.large_graph_threshold,
+                                                                      self.render_conf['large_graph_threshold'])},
+                "focus": {"tables": parse_table_list(self.focus_tables.get()),
+                          "hops": self._get_int_var(self.focus_hops, 2), "direction": self.focus_direction.get()},
+                "diagnostics": {**self.diagnostics_conf, "profile": self.profile_enabled.get()},
+                "logging": {**self.log_conf, "file": self.log_file_path.get()},
+                "sampling": {**self.sampling_conf, "enabled": self.sampling_enabled.get(),
+                             "time_budget_s": self._get_int_var(self.sampling_time_budget,
+                                                                self.sampling_conf['time_budget_s']),
+                             "row_budget": self._get_int_var(self.sampling_row_budget, self.sampling_conf['row_budget'])},
+                "targets": self.targets, }
+
+    def _select_and_load_config(self):
+        path = filedialog.askopenfilename(title="选择配置文件",
+                                          filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+                                          initialdir=os.path.dirname(self.config_file_path.get()))
+        if path: self._load_config(filepath=path)
+
+    def _save_config_as(self):
+        path = filedialog.asksaveasfilename(title="将配置另存为...",
+                                            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+                                            initialdir=os.path.dirname(self.config_file_path.get()),
+                                            defaultextension=".json", initialfile="new_config.json")
+        if path: self._save_config(filepath=path)
+
+    def _on_closing(self):
+        # 先取消全部任务，等它们在下一个检查点退出 (Graphviz 子进程被终止、临时文件被清理) 后再关闭
+        if not self._closing:
+            self._closing = True
+            self._save_config()
+            active = self.executor.active_jobs()
+            if active: self._log(f"正在取消 {len(active)} 个任务，结束后自动退出...", "INFO")
+            self.executor.cancel_all(); self.preview_executor.cancel_all()
+        if self.executor.active_jobs() or self.preview_executor.active_jobs():
+            self.after(100, self._on_closing); return
+        self.executor.shutdown(wait=True); self.preview_executor.shutdown(wait=True); self.pipeline.close()
+        if os.path.exists(f"{self.preview_path}.png"): os.remove(f"{self.preview_path}.png")
+        if self._log_job: self.after_cancel(self._log_job)
+        self.log_queue.close(); self.destroy()
+
+    def _get_worker_count(self):
+        return max(1, self._get_int_var(self.parallel_workers, 1))
+
+    def _get_int_var(self, var, default):
+        try:
+            return int(var.get())
+        except (tk.TclError, ValueError):
+            return default
+
+    # --- 2. UI创建 ---
+    def _create_widgets(self):
+        self.notebook = notebook = ttk.Notebook(self)
+        notebook.pack(fill="both", expand=True, padx=10, pady=10)
+        main_tab, settings_tab, self.viewer_tab = ttk.Frame(notebook), ttk.Frame(notebook), ttk.Frame(notebook)
+        notebook.add(main_tab, text=' 🚀 生成器 ');
+        notebook.add(settings_tab, text=' 🎨 样式与配置 ')
+        notebook.add(self.viewer_tab, text=' 🔍 查看器 ')
+        self._create_main_tab(main_tab);
+        self._create_settings_tab(settings_tab)
+        self.viewer = DiagramViewer(self.viewer_tab, placeholder="生成一次关系图 (外键/推断/多库模式，不拆分) 后在此查看。\n"
+                                                               "拖动平移，滚轮缩放，单击表高亮相邻的表。")
+        self.viewer.pack(fill="both", expand=True)
+        notebook.bind("<<NotebookTabChanged>>", self._refresh_viewer)
+
+    def _create_main_tab(self, parent):
+        parent.columnconfigure(0, weight=1)
+        conn_frame = ttk.LabelFrame(parent, text=" 🗄️ 数据库连接信息 ")
+        conn_frame.grid(row=0, column=0, padx=5, pady=5, sticky="ew");
+        conn_frame.columnconfigure(1, weight=1)
+        ttk.Label(conn_frame, text="数据库类型:").grid(row=0, column=0, padx=10, pady=8, sticky="w")
+        self.db_type_combo = ttk.Combobox(conn_frame, textvariable=self.db_type, state="readonly",
+                                          values=list(self.db_dialect_map.keys()))
+        self.db_type_combo.grid(row=0, column=1, padx=10, pady=8, sticky="w")
+        self.db_type_combo.bind("<<ComboboxSelected>>", self._on_db_type_changed)
+        labels = ["主机:", "端口:", "用户名:", "密码:", "数据库:"]
+        for i, label_text in enumerate(labels, 1):
+            key = label_text.strip(':')
+            label = ttk.Label(conn_frame, text=label_text)
+            label.grid(row=i, column=0, padx=10, pady=8, sticky="w")
+            entry = ttk.Entry(conn_frame, show="*" if "密码" in label_text else "")
+            entry.grid(row=i, column=1, padx=10, pady=8, sticky="ew")
+            self.db_entries[key] = entry
+            setattr(self, f"label_{key}", label);
+            setattr(self, f"entry_{key}", entry)
+        self.db_browse_btn = ttk.Button(conn_frame, text="浏览...", command=self._browse_db_file)
+        self.db_browse_btn.grid(row=5, column=2, padx=5)
+        out_frame = ttk.LabelFrame(parent, text=" 📁 输出路径 ")
+        out_frame.grid(row=1, column=0, padx=5, pady=10, sticky="ew");
+        out_frame.columnconfigure(0, weight=1)
+        path_entry = ttk.Entry(out_frame, textvariable=self.output_path, state="readonly")
+        path_entry.grid(row=0, column=0, padx=10, pady=8, sticky="ew")
+        browse_btn = ttk.Button(out_frame, text="浏览...", command=self._browse_directory)
+        browse_btn.grid(row=0, column=1, padx=10, pady=8)
+        format_combo = ttk.Combobox(out_frame, textvariable=self.output_format, state="readonly",
+                                    values=list(OUTPUT_FORMATS), width=9)
+        format_combo.grid(row=0, column=2, padx=10, pady=8)
+        format_combo.tooltip = ToolTip(format_combo, "png/svg/pdf 需要 Graphviz；dot/mermaid/plantuml/json 由程序直接生成。")
+        focus_frame = ttk.LabelFrame(parent, text=" 🎯 聚焦 (可选) ")
+        focus_frame.grid(row=2, column=0, padx=5, pady=5, sticky="ew");
+        focus_frame.columnconfigure(1, weight=1)
+        ttk.Label(focus_frame, text="中心表:").grid(row=0, column=0, padx=10, pady=8, sticky="w")
+        focus_entry = ttk.Entry(focus_frame, textvariable=self.focus_tables)
+        focus_entry.grid(row=0, column=1, columnspan=4, padx=10, pady=8, sticky="ew")
+        focus_entry.tooltip = ToolTip(focus_entry, "逗号分隔的表名；留空则输出整个数据库。")
+        ttk.Label(focus_frame, text="跳数:").grid(row=1, column=0, padx=10, pady=8, sticky="w")
+        ttk.Spinbox(focus_frame, from_=0, to=20, textvariable=self.focus_hops, width=5).grid(row=1, column=1, padx=10,
+                                                                                              pady=8, sticky="w")
+        ttk.Label(focus_frame, text="方向:").grid(row=1, column=2, padx=10, pady=8, sticky="w")
+        self.direction_combo = ttk.Combobox(focus_frame, state="readonly", values=list(self.direction_map.keys()),
+                                            width=12)
+        self.direction_combo.grid(row=1, column=3, padx=10, pady=8, sticky="w")
+        self.direction_combo.bind("<<ComboboxSelected>>", lambda e: self.focus_direction.set(
+            self.direction_map.get(self.direction_combo.get())))
+        action_frame = ttk.Frame(parent)
+        action_frame.grid(row=3, column=0, pady=10, sticky="ew");
+        action_frame.columnconfigure((0, 1, 2, 3), weight=1)
+        self.test_btn = ttk.Button(action_frame, text="✔️ 测试连接", command=self._test_connection,
+                                   style="Accent.TButton")
+        self.fk_btn = ttk.Button(action_frame, text="🔗 基于外键生成",
+                                 command=lambda: self._run_generation("fk"))
+        self.infer_btn = ttk.Button(action_frame, text="💡 基于约定推断",
+                                    command=lambda: self._run_generation("inference"))
+        self.multi_btn = ttk.Button(action_frame, text="🗂️ 多库外键生成",
+                                    command=lambda: self._run_generation("multi"))
+        self.multi_btn.tooltip = ToolTip(self.multi_btn, "并行反射配置文件 targets 中列出的全部数据库。")
+        self.er_btn = ttk.Button(action_frame, text="📋 列级ER图", command=lambda: self._run_generation("er"))
+        self.er_btn.tooltip = ToolTip(self.er_btn, "节点列出列名、类型与主外键标记，连线连接具体的列。")
+        self.snapshot_btn = ttk.Button(action_frame, text="💾 保存快照",
+                                       command=lambda: self._run_generation("snapshot"))
+        self.snapshot_btn.tooltip = ToolTip(self.snapshot_btn, "把当前数据库的Schema保存为快照文件 (*.json.gz)，供之后差异对比。")
+        self.diff_btn = ttk.Button(action_frame, text="🔍 差异对比", command=self._run_diff)
+        self.diff_btn.tooltip = ToolTip(self.diff_btn, "选择快照文件或另一个连接的配置文件作为基准，只绘制新增、删除与修改的表和外键。")
+        self.test_btn.grid(row=0, column=0, padx=5, ipady=5, sticky="ew");
+        self.fk_btn.grid(row=0, column=1, padx=5, ipady=5, sticky="ew");
+        self.infer_btn.grid(row=0, column=2, padx=5, ipady=5, sticky="ew");
+        self.multi_btn.grid(row=0, column=3, padx=5, ipady=5, sticky="ew");
+        self.er_btn.grid(row=1, column=0, columnspan=2, padx=5, pady=(8, 0), ipady=5, sticky="ew")
+        self.snapshot_btn.grid(row=1, column=2, padx=5, pady=(8, 0), ipady=5, sticky="ew")
+        self.diff_btn.grid(row=1, column=3, padx=5, pady=(8, 0), ipady=5, sticky="ew")
+        job_frame = ttk.LabelFrame(parent, text=" 📋 任务队列 ")
+        job_frame.grid(row=4, column=0, padx=5, pady=5, sticky="ew");
+        job_frame.columnconfigure(0, weight=1)
+        self.job_tree = ttk.Treeview(job_frame, columns=("name", "status", "detail", "elapsed"), show="headings",
+                                     height=4, selectmode="extended")
+        for col, text, width in (("name", "任务", 220), ("status", "状态", 70), ("detail", "进度", 180),
+                                 ("elapsed", "耗时", 70)):
+            self.job_tree.heading(col, text=text); self.job_tree.column(col, width=width, anchor="w")
+        self.job_tree.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+        job_btn_frame = ttk.Frame(job_frame)
+        job_btn_frame.grid(row=0, column=1, padx=5, pady=5, sticky="ns")
+        self.cancel_job_btn = ttk.Button(job_btn_frame, text="取消所选", command=self._cancel_selected_jobs)
+        self.cancel_all_btn = ttk.Button(job_btn_frame, text="全部取消", command=lambda: self.executor.cancel_all())
+        self.cancel_job_btn.pack(pady=5, fill="x");
+        self.cancel_all_btn.pack(pady=5, fill="x")
+        log_frame = ttk.LabelFrame(parent, text=" 📈 状态日志 ")
+        log_frame.grid(row=5, column=0, padx=5, pady=5, sticky="nsew")
+        parent.rowconfigure(5, weight=1);
+        log_frame.columnconfigure(0, weight=1);
+        log_frame.rowconfigure(1, weight=1)
+        self.progress_bar = ttk.Progressbar(log_frame, mode='indeterminate')
+        self.progress_bar.grid(row=0, column=0, padx=10, pady=5, sticky="ew")
+        self.progress_label = ttk.Label(log_frame, text="", width=18, anchor="e")
+        self.progress_label.grid(row=0, column=1, padx=5, pady=5, sticky="e")
+        self.log_text = tk.Text(log_frame, height=10, state="disabled", wrap="word", relief="flat", borderwidth=0)
+        self.log_text.grid(row=1, column=0, padx=10, pady=(5, 10), sticky="nsew")
+        self.log_text.tag_config("SUCCESS", foreground="green");
+        self.log_text.tag_config("ERROR", foreground="red");
+        self.log_text.tag_config("INFO", foreground="blue")
+        log_btn_frame = ttk.Frame(log_frame)
+        log_btn_frame.grid(row=1, column=1, padx=5, pady=5, sticky="ns")
+        self.clear_log_btn = ttk.Button(log_btn_frame, text="清空", command=self._clear_log)
+        self.open_file_btn = ttk.Button(log_btn_frame, text="打开文件", state="disabled", command=self._open_last_file)
+        self.view_btn = ttk.Button(log_btn_frame, text="查看器", state="disabled",
+                                   command=lambda: self.notebook.select(self.viewer_tab))
+        self.view_btn.tooltip = ToolTip(self.view_btn, "在内置查看器中浏览上次生成的关系图 (无需解码整张大图)")
+        self.clear_log_btn.pack(pady=5, fill="x");
+        self.open_file_btn.pack(pady=5, fill="x")
+        self.view_btn.pack(pady=5, fill="x")
+
+    def _create_settings_tab(self, parent):
+        parent.columnconfigure(0, weight=1)
+        config_frame = ttk.LabelFrame(parent, text=" ⚙️ 配置文件管理")
+        config_frame.grid(row=0, column=0, padx=5, pady=10, sticky="ew");
+        config_frame.columnconfigure(0, weight=1)
+        config_path_entry = ttk.Entry(config_frame, textvariable=self.config_file_path, state="readonly")
+        config_path_entry.grid(row=0, column=0, padx=10, pady=8, sticky="ew")
+        config_path_entry.tooltip = ToolTip(config_path_entry, "当前使用的配置文件路径。关闭程序时会自动保存到此路径。")
+        config_btn_frame = ttk.Frame(config_frame)
+        config_btn_frame.grid(row=0, column=1, padx=5, pady=5)
+        load_btn = ttk.Button(config_btn_frame, text="加载...", command=self._select_and_load_config)
+        load_btn.pack(side="left", padx=5)
+        save_as_btn = ttk.Button(config_btn_frame, text="另存为...", command=self._save_config_as)
+        save_as_btn.pack(side="left", padx=5)
+        theme_frame = ttk.LabelFrame(parent, text=" 🎨 应用主题 ")
+        theme_frame.grid(row=1, column=0, padx=5, pady=10, sticky="ew")
+        theme_switch = ttk.Checkbutton(theme_frame, text="切换为暗黑模式", style="Switch.TCheckbutton",
+                                       command=lambda: sv_ttk.set_theme(
+                                           "dark" if theme_switch.instate(['selected']) else "light"))
+        theme_switch.pack(padx=10, pady=10)
+        style_frame = ttk.LabelFrame(parent, text=" 🖌️ 图表样式配置 ")
+        style_frame.grid(row=2, column=0, padx=5, pady=5, sticky="ew");
+        style_frame.columnconfigure(1, weight=1)
+        ttk.Label(style_frame, text="布局方向:").grid(row=0, column=0, padx=10, pady=8, sticky="w")
+        self.layout_combo = ttk.Combobox(style_frame, state="readonly", values=list(self.layout_map.keys()), width=15)
+        self.layout_combo.grid(row=0, column=1, padx=10, pady=8, sticky="w")
+        self.layout_combo.bind("<<ComboboxSelected>>", self._on_style_changed)
+        ttk.Label(style_frame, text="连线样式:").grid(row=1, column=0, padx=10, pady=8, sticky="w")
+        self.spline_combo = ttk.Combobox(style_frame, state="readonly", values=list(self.spline_map.keys()), width=15)
+        self.spline_combo.grid(row=1, column=1, padx=10, pady=8, sticky="w")
+        self.spline_combo.bind("<<ComboboxSelected>>", self._on_style_changed)
+        colors_map = [("背景色", 'bg_color'), ("默认节点色", 'node_color_default'), ("起始节点色", 'node_color_start'),
+                      ("中间节点色", 'node_color_link'), ("末端节点色", 'node_color_end'),
+                      ("新增表颜色", 'node_color_added'), ("删除表颜色", 'node_color_removed'),
+                      ("修改表颜色", 'node_color_changed')]
+        for i, (text, key) in enumerate(colors_map, 2):
+            ttk.Label(style_frame, text=f"{text}:").grid(row=i, column=0, padx=10, pady=5, sticky="w")
+            color_btn = ttk.Button(style_frame, text="选择颜色", command=lambda k=key: self._choose_color(k))
+            color_btn.grid(row=i, column=2, padx=10, pady=5)
+            color_preview = tk.Label(style_frame, textvariable=self.graph_style[key], relief="sunken", width=10)
+            color_preview.grid(row=i, column=1, padx=10, pady=5, sticky="w")
+            self.graph_style[key].trace_add("write", lambda name, index, mode, var=self.graph_style[key],
+                                                            preview=color_preview: preview.config(bg=var.get()))
+        for var in self.graph_style.values(): var.trace_add("write", lambda *_: self._schedule_preview())
+        preview_frame = ttk.LabelFrame(parent, text=" 👁️ 样式预览 ")
+        preview_frame.grid(row=0, column=1, rowspan=7, padx=5, pady=10, sticky="nsew");
+        parent.columnconfigure(1, weight=1)
+        preview_frame.columnconfigure(0, weight=1);
+        preview_frame.rowconfigure(0, weight=1)
+        self.preview_label = ttk.Label(preview_frame, text="生成一次关系图后，\n在此预览样式修改。", anchor="center",
+                                       justify="center")
+        self.preview_label.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        apply_style_btn = ttk.Button(preview_frame, text="应用到输出文件", command=self._apply_style)
+        apply_style_btn.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="ew")
+        apply_style_btn.tooltip = ToolTip(apply_style_btn, "按当前样式重新生成上次的输出文件，不重新读取数据库；"
+                                                           "只改颜色时复用原有布局。")
+        parallel_frame = ttk.LabelFrame(parent, text=" ⚡ 并行反射 ")
+        parallel_frame.grid(row=3, column=0, padx=5, pady=10, sticky="ew");
+        parallel_frame.columnconfigure(1, weight=1)
+        ttk.Label(parallel_frame, text="工作线程数:").grid(row=0, column=0, padx=10, pady=8, sticky="w")
+        workers_spin = ttk.Spinbox(parallel_frame, from_=1, to=64, textvariable=self.parallel_workers, width=8)
+        workers_spin.grid(row=0, column=1, padx=10, pady=8, sticky="w")
+        workers_spin.tooltip = ToolTip(workers_spin, "同时反射的Schema/数据库数量，也是共享连接池的大小。")
+        ttk.Label(parallel_frame, text="多库输出:").grid(row=1, column=0, padx=10, pady=8, sticky="w")
+        self.merge_mode_combo = ttk.Combobox(parallel_frame, state="readonly", values=list(self.merge_mode_map.keys()),
+                                             width=15)
+        self.merge_mode_combo.grid(row=1, column=1, padx=10, pady=8, sticky="w")
+        self.merge_mode_combo.bind("<<ComboboxSelected>>",
+                                   lambda e: self.merge_mode.set(self.merge_mode_map.get(self.merge_mode_combo.get())))
+        render_frame = ttk.LabelFrame(parent, text=" 🧩 大图渲染 ")
+        render_frame.grid(row=4, column=0, padx=5, pady=10, sticky="ew");
+        render_frame.columnconfigure(1, weight=1)
+        ttk.Label(render_frame, text="拆分方式:").grid(row=0, column=0, padx=10, pady=8, sticky="w")
+        self.partition_combo = ttk.Combobox(render_frame, state="readonly", values=list(self.partition_map.keys()),
+                                            width=15)
+        self.partition_combo.grid(row=0, column=1, padx=10, pady=8, sticky="w")
+        self.partition_combo.bind("<<ComboboxSelected>>",
+                                  lambda e: self.partition_mode.set(self.partition_map.get(self.partition_combo.get())))
+        self.partition_combo.tooltip = ToolTip(self.partition_combo, "拆分后每个分区单独出图并行渲染，另生成HTML索引页。")
+        ttk.Label(render_frame, text="sfdp阈值(节点数):").grid(row=1, column=0, padx=10, pady=8, sticky="w")
+        threshold_spin = ttk.Spinbox(render_frame, from_=50, to=100000, increment=50,
+                                     textvariable=self.large_graph_threshold, width=8)
+        threshold_spin.grid(row=1, column=1, padx=10, pady=8, sticky="w")
+        threshold_spin.tooltip = ToolTip(threshold_spin, "节点数超过该值时改用 sfdp 布局，避免 dot 长时间运行。")
+        diagnostics_frame = ttk.LabelFrame(parent, text=" 🩺 诊断 ")
+        diagnostics_frame.grid(row=5, column=0, padx=5, pady=10, sticky="ew");
+        diagnostics_frame.columnconfigure(1, weight=1)
+        profile_check = ttk.Checkbutton(diagnostics_frame, text="记录性能剖析 (cProfile)", variable=self.profile_enabled)
+        profile_check.grid(row=0, column=0, columnspan=4, padx=10, pady=8, sticky="w")
+        profile_check.tooltip = ToolTip(profile_check, "生成时用 cProfile 记录主线程，统计写入输出目录的 *.prof 文件，"
+                                                       "耗时最高的函数同时输出到日志。")
+        ttk.Label(diagnostics_frame, text="日志文件:").grid(row=1, column=0, padx=10, pady=8, sticky="w")
+        log_file_entry = ttk.Entry(diagnostics_frame, textvariable=self.log_file_path, state="readonly")
+        log_file_entry.grid(row=1, column=1, padx=10, pady=8, sticky="ew")
+        log_file_entry.tooltip = ToolTip(log_file_entry, "日志同时写入该文件，超过大小上限后自动轮转；留空则不写文件。")
+        ttk.Button(diagnostics_frame, text="选择...", command=self._choose_log_file).grid(row=1, column=2, padx=5)
+        ttk.Button(diagnostics_frame, text="停用", command=lambda: (self.log_file_path.set(''),
+                                                                    self._apply_log_settings())).grid(row=1, column=3,
+                                                                                                      padx=5)
+        sampling_frame = ttk.LabelFrame(parent, text=" 🔬 数据采样推断 ")
+        sampling_frame.grid(row=6, column=0, padx=5, pady=10, sticky="ew");
+        sampling_frame.columnconfigure(1, weight=1)
+        sampling_check = ttk.Checkbutton(sampling_frame, text="推断模式同时按列值采样", variable=self.sampling_enabled)
+        sampling_check.grid(row=0, column=0, columnspan=2, padx=10, pady=8, sticky="w")
+        sampling_check.tooltip = ToolTip(sampling_check, "读取各表的部分数据，子表列的样本值几乎都出现在某张表的主键中时"
+                                                         "推断为外键；适合列名不符合命名约定的旧库。")
+        ttk.Label(sampling_frame, text="时间预算(秒):").grid(row=1, column=0, padx=10, pady=8, sticky="w")
+        ttk.Spinbox(sampling_frame, from_=5, to=3600, increment=5, textvariable=self.sampling_time_budget,
+                    width=8).grid(row=1, column=1, padx=10, pady=8, sticky="w")
+        ttk.Label(sampling_frame, text="读取行数上限:").grid(row=2, column=0, padx=10, pady=8, sticky="w")
+        row_budget_spin = ttk.Spinbox(sampling_frame, from_=10000, to=100000000, increment=100000,
+                                      textvariable=self.sampling_row_budget, width=10)
+        row_budget_spin.grid(row=2, column=1, padx=10, pady=8, sticky="w")
+        row_budget_spin.tooltip = ToolTip(row_budget_spin, "所有表合计最多读取的行数；每张表另受 rows_per_table 限制。")
+
+    # --- 3. 核心逻辑 ---
+    def _on_db_type_changed(self, event=None):
+        selected_db, is_sqlite = self.db_type.get(), self.db_type.get() == "SQLite"
+        for key in ["主机", "端口", "用户名", "密码"]:
+            state = "disabled" if is_sqlite else "normal"
+            getattr(self, f"label_{key}").config(state=state)
+            entry = getattr(self, f"entry_{key}")
+            entry.config(state=state)
+            if event: entry.delete(0, tk.END)
+        self.label_数据库.config(text="数据库文件:" if is_sqlite else "数据库:")
+        if event: self.entry_数据库.delete(0, tk.END)
+        if is_sqlite:
+            self.db_browse_btn.grid()
+        else:
+            self.db_browse_btn.grid_remove()
+
+    def _browse_db_file(self):
+        path = filedialog.askopenfilename(title="选择SQLite数据库文件",
+                                          filetypes=[("SQLite Database", "*.db"), ("SQLite3", "*.sqlite3"),
+                                                     ("All files", "*.*")])
+        if path: self.db_entries["数据库"].delete(0, tk.END); self.db_entries["数据库"].insert(0, path)
+
+    def _on_style_changed(self, event):
+        widget = event.widget
+        if widget == self.layout_combo:
+            self.graph_style['layout'].set(self.layout_map.get(self.layout_combo.get()))
+        elif widget == self.spline_combo:
+            self.graph_style['spline'].set(self.spline_map.get(self.spline_combo.get()))
+
+    def _update_ui_from_style_vars(self):
+        self.layout_combo.set(self.layout_map_rev.get(self.graph_style['layout'].get()));
+        self.spline_combo.set(self.spline_map_rev.get(self.graph_style['spline'].get()));
+        self.merge_mode_combo.set(self.merge_mode_map_rev.get(self.merge_mode.get()));
+        self.partition_combo.set(self.partition_map_rev.get(self.partition_mode.get()));
+        self.direction_combo.set(self.direction_map_rev.get(self.focus_direction.get()))
+
+    def _choose_color(self, key):
+        color_code = colorchooser.askcolor(title="选择颜色", initialcolor=self.graph_style[key].get());
+        if color_code[1]: self.graph_style[key].set(color_code[1])
+
+    # --- 样式预览 ---
+    def _schedule_preview(self):
+        # 连续修改 (如拖动取色) 时合并为一次预览
+        if self._preview_after: self.after_cancel(self._preview_after)
+        self._preview_after = self.after(150, self._refresh_preview)
+
+    def _current_style(self):
+        return {key: var.get() for key, var in self.graph_style.items()}
+
+    def _refresh_preview(self):
+        self._preview_after = None
+        if self._closing or self.pipeline.retained.get('graph') is None: return
+        style = self._current_style()
+        # 只保留最新的一次预览，旧的预览连同 Graphviz 进程一起取消
+        self.preview_executor.cancel_all()
+        self.preview_executor.submit("预览", lambda job: self._render_preview(job, style))
+
+    def _render_preview(self, job, style):
+        pipeline = self.pipeline.fork(log=quiet_log, cancel_token=job.token)
+        try:
+            path = pipeline.restyle(style, fmt="png", output_filename=self.preview_path, dpi=PREVIEW_DPI)
+        except (RenderError, NoRelationsError) as e:
+            self.after(0, lambda: self.preview_label.config(image="", text=f"预览失败:\n{e}")); raise
+        self.after(0, self.__show_preview, path)
+
+    def __show_preview(self, path):
+        try:
+            image = tk.PhotoImage(file=path)
+        except tk.TclError as e:
+            self.preview_label.config(image="", text=f"预览失败:\n{e}"); return
+        # PhotoImage 只能按整数倍缩小，取能放进预览区域的最小倍数
+        width, height = max(self.preview_label.winfo_width(), 1), max(self.preview_label.winfo_height(), 1)
+        factor = max(1, math.ceil(image.width() / width), math.ceil(image.height() / height))
+        self._preview_image = image.subsample(factor) if factor > 1 else image
+        self.preview_label.config(image=self._preview_image, text="")
+
+    def _apply_style(self):
+        graph = self.pipeline.retained.get('graph')
+        if graph is None:
+            messagebox.showinfo("提示", "没有可复用的关系图，请先生成一次关系图。"); return
+        style = self._current_style()
+        self._submit_job(f"应用样式 - {os.path.basename(graph.output_filename)}",
+                         lambda job: self._execute_restyle(job, style))
+
+    def _execute_restyle(self, job, style):
+        pipeline = self.pipeline.fork(progress=lambda stage, done, total: self._job_progress(job, stage, done, total),
+                                      cancel_token=job.token)
+        try:
+            path = pipeline.restyle(style)
+            self.last_generated_file = path
+            self._log(f"🎉 图表已按新样式更新: {path}", "SUCCESS")
+            self.after(0, lambda: self.open_file_btn.config(state="normal"))
+            self.after(0, self._refresh_viewer)
+            return path
+        except JobCancelledError:
+            self._log(f"⏹️ 任务已取消: {job.name}", "INFO")
+            raise
+        except (RenderError, NoRelationsError) as e:
+            self._handle_error(e, "渲染错误", str(e))
+        except Exception as e:
+            self._handle_error(e, "未知错误")
+        raise RuntimeError(f"{job.name} 失败")
+
+    # --- 内置查看器 ---
+    def _refresh_viewer(self, event=None):
+        # 只在查看器标签页可见时加载；布局只取一次 (plain 格式)，之后的平移缩放都在画布上完成
+        if self._closing or self.notebook.select() != str(self.viewer_tab): return
+        style, graph = self._current_style(), self.pipeline.retained.get('graph')
+        self.view_btn.config(state="normal" if graph is not None else "disabled")
+        if graph is None:
+            self._viewer_key = None; self.viewer.clear(); return
+        self.viewer.set_style(style)
+        key = (graph, style['layout'], style['spline'])
+        if key == self._viewer_key: return
+        self._viewer_key = key
+        self._submit_job(f"查看器 - {os.path.basename(graph.output_filename)}",
+                         lambda job: self._execute_viewer_layout(job, style))
+
+    def _execute_viewer_layout(self, job, style):
+        pipeline = self.pipeline.fork(progress=lambda stage, done, total: self._job_progress(job, stage, done, total),
+                                      cancel_token=job.token)
+        try:
+            text, graph = pipeline.viewer_layout(style)
+            model = ViewerModel(text, graph.kinds)
+            # 重新布局后保留的关系图已被替换，记下新的对象，避免下次切换标签页时重复加载
+            self._viewer_key = (graph, style['layout'], style['spline'])
+            self.after(0, self.viewer.load, model, style)
+            self._log(f"查看器已加载 {len(model.nodes)} 张表、{len(model.edges)} 条关系。", "INFO")
+            return len(model.nodes)
+        except JobCancelledError:
+            self._viewer_key = None
+            self._log(f"⏹️ 任务已取消: {job.name}", "INFO")
+            raise
+        except (RenderError, NoRelationsError) as e:
+            self._viewer_key = None
+            self.after(0, lambda: self.viewer.clear(f"加载失败:\n{e}"))
+            self._log(f"❌ 查看器加载失败: {e}", "ERROR")
+        except Exception as e:
+            self._viewer_key = None
+            self._handle_error(e, "未知错误")
+        raise RuntimeError(f"{job.name} 失败")
+
+    def _log(self, msg, level="INFO"):
+        # 任意线程均可调用，只入队不触碰控件
+        self.log_queue(msg, level)
+
+    def _drain_log(self):
+        records, dropped = self.log_queue.drain()
+        if records: self.__append_log(records, dropped)
+        if self._jobs_dirty: self._jobs_dirty = False; self._refresh_jobs()
+        self._log_job = self.after(self.log_conf.get('flush_interval_ms', 100), self._drain_log)
+
+    def __append_log(self, records, dropped):
+        # 相邻同级别的日志合并成一段，整批只调用一次 insert
+        chunks = [f"[INFO] …… 省略 {dropped} 条日志 ……\n", "INFO"] if dropped else []
+        for level, group in groupby(records, key=lambda record: record[0]):
+            chunks += ["".join(f"[{level}] {msg}\n" for _, msg in group), level]
+        self.log_text.config(state="normal")
+        self.log_text.insert(tk.END, *chunks)
+        # 环形缓冲：只保留最近 max_lines 行
+        excess = int(self.log_text.index("end-1c").split('.')[0]) - 1 - self.log_queue.max_lines
+        if excess > 0: self.log_text.delete("1.0", f"{excess + 1}.0")
+        self.log_text.see(tk.END); self.log_text.config(state="disabled")
+
+    def _apply_log_settings(self):
+        self.log_queue.max_lines = max(1, int(self.log_conf.get('max_lines', 5000)))
+        try:
+            self.log_queue.set_file(self.log_file_path.get(), self.log_conf['file_max_bytes'],
+                                    self.log_conf['file_backups'])
+        except OSError as e:
+            self.log_file_path.set(''); self._log(f"无法打开日志文件: {e}", "ERROR")
+
+    def _choose_log_file(self):
+        path = filedialog.asksaveasfilename(title="选择日志文件", defaultextension=".log",
+                                            initialfile="relationship_diagram.log",
+                                            filetypes=[("Log files", "*.log"), ("All files", "*.*")])
+        if path: self.log_file_path.set(path); self._apply_log_settings(); self._log(f"日志将同时写入: {path}", "INFO")
+
+    def _clear_log(self):
+        self.log_text.config(state="normal"); self.log_text.delete(1.0, tk.END); self.log_text.config(state="disabled")
+
+    def _open_last_file(self):
+        if self.last_generated_file and os.path.exists(self.last_generated_file):
+            webbrowser.open(self.last_generated_file)
+        else:
+            messagebox.showwarning("警告", "找不到上次生成的文件。")
+
+    def _browse_directory(self):
+        path = filedialog.askdirectory(initialdir=self.output_path.get())
+        if path: self.output_path.set(path); self._log(f"输出路径已更新: {path}", "INFO")
+
+    def _progress(self, stage, done, total):
+        # 可能在工作线程中高频调用，最多每 0.1 秒刷新一次界面
+        now = time.monotonic()
+        if total and 0 < done < total and now - self._last_progress_time < 0.1: return
+        self._last_progress_time = now
+        self.after(0, self.__update_progress, stage, done, total)
+
+    def __update_progress(self, stage, done, total):
+        if total:
+            if str(self.progress_bar.cget("mode")) != "determinate":
+                self.progress_bar.stop(); self.progress_bar.config(mode="determinate")
+            self.progress_bar.config(maximum=total, value=done)
+            self.progress_label.config(text=f"{stage or ''} {done}/{total}")
+        else:
+            if str(self.progress_bar.cget("mode")) != "indeterminate":
+                self.progress_bar.config(mode="indeterminate", value=0); self.progress_bar.start(10)
+            self.progress_label.config(text=f"{stage or ''}...")
+
+    # --- 任务队列 ---
+    def _on_job_changed(self, job):
+        # 在工作线程中调用，只做标记，由日志定时器统一刷新任务列表
+        self._jobs_dirty = True
+
+    def _job_progress(self, job, stage, done, total):
+        job.detail = f"{stage or ''} {done}/{total}" if total else f"{stage or ''}..."
+        self._jobs_dirty = True
+        self._progress(stage, done, total)
+
+    def _refresh_jobs(self):
+        jobs = self.executor.jobs
+        ids = {str(job.id) for job in jobs}
+        for item in self.job_tree.get_children():
+            if item not in ids: self.job_tree.delete(item)
+        for job in jobs:
+            values = (job.name, JOB_STATUSES[job.status], job.detail if job.active or job.error is None else str(job.error),
+                      f"{job.elapsed:.1f}s" if job.started else "")
+            if self.job_tree.exists(str(job.id)):
+                self.job_tree.item(str(job.id), values=values)
+            else:
+                self.job_tree.insert("", tk.END, iid=str(job.id), values=values)
+        if not any(job.status == 'running' for job in jobs):
+            self.progress_bar.stop(); self.progress_bar.config(value=0); self.progress_label.config(text="")
+
+    def _cancel_selected_jobs(self):
+        for item in self.job_tree.selection(): self.executor.cancel(int(item))
+
+    def _submit_job(self, name, func):
+        if self._closing: return
+        self.executor.submit(name, func)
+        self._log(f"已加入任务队列: {name}", "INFO")
+
+    # --- 数据库核心逻辑 (委托给 diagram_core) ---
+    def _test_connection(self):
+        # 配置在界面线程中读取，任务只使用这份副本
+        config = merge_config(self._collect_config(include_password=True))
+        self._submit_job(f"测试连接 - {config['database'].get('数据库') or config['db_type']}",
+                         lambda job: self._execute_test_connection(config))
+
+    def _run_generation(self, mode, baseline=None):
+        config = merge_config(self._collect_config(include_password=True))
+        cache_dir = cache_dir_for(self.config_file_path.get())
+        mode_names = {"fk": "外键关系图", "inference": "推断关系图", "multi": "多库关系图", "er": "列级ER图",
+                      "snapshot": "保存快照", "diff": "差异对比"}
+        name = f"{mode_names.get(mode, mode)} - {config['database'].get('数据库') or config['db_type']}"
+        self._submit_job(name, lambda job: self._execute_generation(job, mode, config, cache_dir, baseline))
+
+    def _run_diff(self):
+        path = filedialog.askopenfilename(title="选择对比基准 (快照或配置文件)", initialdir=self.output_path.get(),
+                                          filetypes=[("Schema快照", "*.json.gz"), ("配置文件", "*.json"),
+                                                     ("所有文件", "*.*")])
+        if path: self._run_generation("diff", baseline=path)
+
+    def _execute_test_connection(self, config):
+        try:
+            self._log("正在创建数据库引擎...", "INFO")
+            engine = self.pipeline.engine_for(config)
+            self._log(f"正在连接 ({engine.dialect.name})...", "INFO")
+            with engine.connect() as connection:
+                self._log("✅ 连接成功！", "SUCCESS"); self.after(0, lambda: messagebox.showinfo("成功",
+                                                                                               f"数据库连接成功！\n方言: {engine.dialect.name}"))
+            return
+        except ImportError as e:
+            self._handle_error(e, "驱动错误",
+                               f"数据库驱动未安装。\n请根据选择的数据库类型安装对应库，例如 'pip install {e.name}'。\n\n错误详情: {e}")
+        except SQLAlchemyError as e:
+            self._handle_error(e, "连接失败")
+        except Exception as e:
+            self._handle_error(e, "未知错误")
+        raise RuntimeError("连接失败")
+
+    def _execute_generation(self, job, mode, config, cache_dir, baseline=None):
+        # 每个任务用独立的流水线 (统计、进度、取消标记)，引擎与连接池仍然共享
+        pipeline = self.pipeline.fork(progress=lambda stage, done, total: self._job_progress(job, stage, done, total),
+                                      cancel_token=job.token)
+        try:
+            if mode == "diff":
+                if not baseline.endswith(".gz"):
+                    # 基准配置未保存密码时沿用当前连接的密码
+                    baseline_conf = load_config(baseline)
+                    if not baseline_conf["database"].get('密码'):
+                        baseline_conf["database"]['密码'] = config["database"].get('密码', '')
+                    baseline, baseline_cache = baseline_conf, cache_dir_for(baseline)
+                else:
+                    baseline_cache = None
+                paths = pipeline.run_diff(config, baseline, cache_dir=cache_dir, baseline_cache_dir=baseline_cache)
+            else:
+                paths = pipeline.run(config, mode=mode, cache_dir=cache_dir)
+            self.last_generated_file, paths_text = paths[-1], "\n".join(paths)
+            self.after(0, lambda: self.open_file_btn.config(state="normal"))
+            self.after(0, self._schedule_preview); self.after(0, self._refresh_viewer)
+            if self.pipeline.retained.get('graph') is not None: self.after(0, lambda: self.view_btn.config(state="normal"))
+            if not self._closing:
+                self.after(0, lambda: messagebox.showinfo("完成", f"图表已成功生成！\n路径: {paths_text}"))
+            return paths
+        except JobCancelledError:
+            self._log(f"⏹️ 任务已取消: {job.name}", "INFO")
+            raise
+        except NoRelationsError as e:
+            self._log(f"⚠️ {e}任务中止。", "ERROR")
+            self.after(0, lambda: messagebox.showwarning("提示", str(e)))
+        except RenderError as e:
+            self._handle_error(e, "渲染错误", str(e))
+        except ImportError as e:
+            self._handle_error(e, "驱动错误",
+                               f"数据库驱动未安装。\n请根据选择的数据库类型安装对应库，例如 'pip install {e.name}'。\n\n错误详情: {e}")
+        except SQLAlchemyError as e:
+            self._handle_error(e, "推断失败" if mode == "inference" else "生成失败")
+        except Exception as e:
+            self._handle_error(e, "未知错误")
+        # 错误已在界面中报告，这里只让任务队列把状态标为失败
+        raise RuntimeError(f"{job.name} 失败")
+
+    def _handle_error(self, e, title, custom_msg=None):
+        self._log(f"❌ {title}失败: {e}", "ERROR")
+        msg = custom_msg or f"{title}失败:\n{e}"
+        self.after(0, lambda: messagebox.showerror(title, msg))
+
+
+if __name__ == "__main__":
+    app = UltimateBeautifiedApp()
+    app.mainloop()
\ No newline at end of file
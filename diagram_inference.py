@@ -0,0 +1,140 @@
+import re
+
+# --- 命名规则注册表 ---
+# 规则接收列名，返回该列可能指向的表名"词干"，不匹配时返回 None
+NAMING_RULES = {}
+
+
+def naming_rule(name):
+    def decorator(func):
+        NAMING_RULES[name] = func
+        return func
+    return decorator
+
+
+@naming_rule('suffix_id')
+def _rule_suffix_id(column):
+    # user_id / USER_ID -> user
+    if len(column) > 3 and column[-3:].lower() == '_id': return column[:-3]
+    return None
+
+
+@naming_rule('camel_id')
+def _rule_camel_id(column):
+    # userId / UserID -> user
+    if len(column) > 2 and column[-2:] in ('Id', 'ID') and column[-3].isalnum() and not column[-3].isupper():
+        return column[:-2]
+    return None
+
+
+@naming_rule('suffix_fk')
+def _rule_suffix_fk(column):
+    # user_fk -> user
+    if len(column) > 3 and column[-3:].lower() == '_fk': return column[:-3]
+    return None
+
+
+def regex_rule(pattern):
+    """由配置中的正则构造规则，第一个捕获组为表名词干，如 "^(.+)_no$"。"""
+    compiled = re.compile(pattern)
+
+    def rule(column):
+        m = compiled.match(column)
+        return m.group(1) if m else None
+    return rule
+
+
+def get_default_inference_settings():
+    return {'rules': ['suffix_id', 'camel_id'], 'table_prefixes': ['t_', 'tbl_'], 'target_pk_columns': ['id']}
+
+
+# --- 名称规范化 ---
+_CAMEL_RE = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+_IRREGULAR_SINGULAR = {'people': 'person', 'children': 'child', 'men': 'man', 'women': 'woman', 'data': 'data',
+                       'status': 'status', 'news': 'news', 'series': 'series', 'address': 'address'}
+
+
+def singularize(word):
+    if word in _IRREGULAR_SINGULAR: return _IRREGULAR_SINGULAR[word]
+    if len(word) > 3 and word.endswith('ies'): return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith(('ses', 'xes', 'zes', 'ches', 'shes')): return word[:-2]
+    if len(word) > 1 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')): return word[:-1]
+    return word
+
+
+class NameNormalizer:
+    """把表名或列名词干规范化为同一个键：去前缀、拆驼峰、小写、末词单数化、去下划线。"""
+
+    def __init__(self, table_prefixes=()):
+        # 长前缀优先，避免 "t_" 先于 "tbl_" 被剥离
+        self.prefixes = sorted((p.lower() for p in table_prefixes if p), key=len, reverse=True)
+        self._memo = {}
+
+    def __call__(self, name):
+        key = self._memo.get(name)
+        if key is None:
+            key = self._memo[name] = self._normalize(name)
+        return key
+
+    def _normalize(self, name):
+        words = [w for w in _CAMEL_RE.sub('_', name).lower().replace('-', '_').split('_') if w]
+        if not words: return name.lower()
+        joined = '_'.join(words)
+        for prefix in self.prefixes:
+            if joined.startswith(prefix) and len(joined) > len(prefix):
+                words = [w for w in joined[len(prefix):].split('_') if w]
+                break
+        words[-1] = singularize(words[-1])
+        return ''.join(words)
+
+
+# --- 推断引擎 ---
+class InferenceEngine:
+    def __init__(self, rules=None, table_prefixes=(), target_pk_columns=('id',)):
+        self.rules = list(rules if rules is not None else (NAMING_RULES['suffix_id'], NAMING_RULES['camel_id']))
+        self.normalize = NameNormalizer(table_prefixes)
+        self.target_pk_columns = {c.lower() for c in target_pk_columns}
+
+    @classmethod
+    def from_config(cls, conf=None):
+        conf = {**get_default_inference_settings(), **(conf or {})}
+        rules = []
+        for rule in conf['rules']:
+            if isinstance(rule, dict) and rule.get('pattern'):
+                rules.append(regex_rule(rule['pattern']))
+            elif rule in NAMING_RULES:
+                rules.append(NAMING_RULES[rule])
+            else:
+                raise ValueError(f"未知的命名规则: {rule}")
+        return cls(rules, conf['table_prefixes'], conf['target_pk_columns'])
+
+    def build_index(self, tables_metadata):
+        """规范化表名 -> [(表名, 小写主键集合)]，只收录有主键的表。"""
+        index = {}
+        for t_name, info in tables_metadata.items():
+            if not info['pks']: continue
+            index.setdefault(self.normalize(t_name), []).append((t_name, {p.lower() for p in info['pks']}))
+        return index
+
+    def _match(self, candidates, base, column):
+        # 目标表主键需为约定主键列(默认 id)或与外键列同名；多个候选时优先表名与词干完全相同者
+        column, base = column.lower(), base.lower()
+        if len(candidates) > 1: candidates = sorted(candidates, key=lambda c: c[0].lower() not in (base, base + 's'))
+        for t_name, pks in candidates:
+            if column in pks or not self.target_pk_columns.isdisjoint(pks): return t_name
+        return None
+
+    def infer(self, tables_metadata):
+        index, relations = self.build_index(tables_metadata), set()
+        for t_name, info in tables_metadata.items():
+            pks = info['pks']
+            for c_name in info['cols']:
+                if c_name in pks: continue
+                for rule in self.rules:
+                    base = rule(c_name)
+                    if not base: continue
+                    candidates = index.get(self.normalize(base))
+                    target = candidates and self._match(candidates, base, c_name)
+                    if target:
+                        relations.add((t_name, target)); break
+        return relations
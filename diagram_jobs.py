@@ -0,0 +1,107 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- 可取消的任务执行器 ---
+# 任务函数接收 Job，在表/Schema/渲染步骤之间调用 job.token.raise_if_cancelled()（流水线通过进度回调自动检查）
+JOB_STATUSES = {'queued': '排队中', 'running': '运行中', 'done': '完成', 'failed': '失败', 'cancelled': '已取消'}
+
+
+class JobCancelledError(RuntimeError):
+    pass
+
+
+class CancelToken(threading.Event):
+    """取消标记。与 multiprocessing 的 Event 一样提供 is_set()，渲染子进程可以用同一接口检查。"""
+
+    def cancel(self):
+        self.set()
+
+    def raise_if_cancelled(self):
+        if self.is_set(): raise JobCancelledError("任务已取消。")
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, name, func):
+        self.id, self.name, self.func = next(Job._ids), name, func
+        self.token = CancelToken()
+        self.status, self.detail = 'queued', ''
+        self.result = self.error = None
+        self.started = self.finished = None
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def elapsed(self):
+        if self.started is None: return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobExecutor:
+    """固定大小的线程池执行排队任务；on_change(job) 在任务状态或 detail 变化时回调（在工作线程中）。
+
+    已结束的任务最多保留 history 个，供界面显示。
+    """
+
+    def __init__(self, workers=2, on_change=None, history=50):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="diagram-job")
+        self._jobs, self._lock = [], threading.Lock()
+        self.on_change, self.history = on_change, history
+
+    def submit(self, name, func):
+        """func(job) 在工作线程中执行，返回值存入 job.result。"""
+        job = Job(name, func)
+        with self._lock:
+            self._jobs.append(job)
+            finished = [j for j in self._jobs if not j.active]
+            for old in finished[:max(0, len(finished) - self.history)]: self._jobs.remove(old)
+        self._pool.submit(self._run, job)
+        self._changed(job)
+        return job
+
+    def _run(self, job):
+        if job.token.is_set():
+            job.status = 'cancelled'; self._changed(job); return
+        job.status, job.started = 'running', time.monotonic(); self._changed(job)
+        try:
+            job.result = job.func(job)
+            job.status = 'done'
+        except JobCancelledError as e:
+            job.status, job.error = 'cancelled', e
+        except Exception as e:
+            # 异常由任务函数自行报告；这里只记录状态，保证线程池继续运行
+            job.status, job.error = 'failed', e
+        finally:
+            job.finished = time.monotonic(); self._changed(job)
+
+    def _changed(self, job):
+        if self.on_change: self.on_change(job)
+
+    def update(self, job, detail):
+        job.detail = detail; self._changed(job)
+
+    @property
+    def jobs(self):
+        with self._lock: return list(self._jobs)
+
+    def active_jobs(self):
+        return [job for job in self.jobs if job.active]
+
+    def cancel(self, job_id):
+        for job in self.jobs:
+            if job.id == job_id and job.active:
+                job.token.cancel()
+                if job.status == 'queued': job.status = 'cancelled'; self._changed(job)
+                return True
+        return False
+
+    def cancel_all(self):
+        for job in self.active_jobs(): self.cancel(job.id)
+
+    def shutdown(self, wait=True):
+        self.cancel_all(); self._pool.shutdown(wait=wait)
@@ -0,0 +1,79 @@
+import logging
+import queue
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+# --- 日志管线：工作线程只入队，界面按固定间隔批量取出 ---
+LOG_LEVELS = {'INFO': logging.INFO, 'SUCCESS': logging.INFO, 'ERROR': logging.ERROR}
+
+
+def get_default_log_settings():
+    return {'max_lines': 5000, 'flush_interval_ms': 100, 'file': '', 'file_max_bytes': 5 * 1024 * 1024,
+            'file_backups': 3}
+
+
+def open_log_file(path, max_bytes=5 * 1024 * 1024, backups=3):
+    """返回写入 path 的轮转文件 logger；同一路径重复打开时复用同一个 handler。"""
+    logger = logging.getLogger(f"relationship_diagram.file.{path}")
+    if not logger.handlers:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler); logger.setLevel(logging.INFO); logger.propagate = False
+    return logger
+
+
+def close_log_file(logger):
+    for handler in list(logger.handlers):
+        handler.close(); logger.removeHandler(handler)
+
+
+def file_log(logger):
+    """把 logger 包装成 log(msg, level) 回调。"""
+    return lambda msg, level="INFO": logger.log(LOG_LEVELS.get(level, logging.INFO), f"[{level}] {msg}")
+
+
+def tee_log(*logs):
+    logs = [log for log in logs if log]
+
+    def log(msg, level="INFO"):
+        for target in logs: target(msg, level)
+    return log
+
+
+class LogQueue:
+    """线程安全的日志回调：调用时只入队（并可同步写入轮转日志文件），由界面线程定时 drain()。
+
+    drain() 最多保留最近 max_lines 条，超出部分计入丢弃数，保证一次刷新的工作量有上限。
+    """
+
+    def __init__(self, max_lines=5000):
+        self.max_lines = max(1, int(max_lines))
+        self._queue = queue.SimpleQueue()
+        self._file_logger = None
+
+    def __call__(self, msg, level="INFO"):
+        self._queue.put((level, msg))
+        logger = self._file_logger
+        if logger is not None: logger.log(LOG_LEVELS.get(level, logging.INFO), f"[{level}] {msg}")
+
+    def set_file(self, path, max_bytes=5 * 1024 * 1024, backups=3):
+        """path 为空时停止写文件。"""
+        old, self._file_logger = self._file_logger, open_log_file(path, max_bytes, backups) if path else None
+        if old is not None and old is not self._file_logger: close_log_file(old)
+
+    def close(self):
+        self.set_file(None)
+
+    def drain(self):
+        """取出调用时已在队列中的日志，返回 (最近的 max_lines 条 [(level, msg)], 丢弃条数)。
+
+        只取调用时的队列长度，生产者持续写入时也不会让界面线程卡在这里。
+        """
+        records, total = deque(maxlen=self.max_lines), 0
+        for _ in range(self._queue.qsize()):
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            total += 1
+        return list(records), total - len(records)
@@ -0,0 +1,96 @@
+import contextlib
+import cProfile
+import io
+import pstats
+import threading
+import time
+
+from diagram_reflection import count_queries
+
+# --- 运行统计：分阶段计时、计数器与进度 ---
+# progress 回调签名: progress(阶段名, 已完成, 总数)，总数为 None 表示进度未知；可能在工作线程中调用
+COUNTER_LABELS = {'tables': '反射表数', 'queries': '目录查询', 'relations': '关系数', 'dot_bytes': 'DOT字节',
+                  'files': '输出文件', 'sampled_rows': '采样行数', 'sample_queries': '验证查询'}
+
+
+def get_default_diagnostics_settings():
+    return {'profile': False, 'profile_top': 25}
+
+
+class RunMetrics:
+    """一次生成任务的统计。stage() 计时可重复进入，同名阶段累加；add() 累加计数器，线程安全。"""
+
+    def __init__(self, progress=None):
+        self.timings, self.counters = {}, {}
+        self._progress, self._lock = progress, threading.Lock()
+        self._current = None
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name, engine=None):
+        """engine 不为空时同时统计该阶段发出的目录查询数。"""
+        self._current = name
+        self.progress(0, None)
+        start = time.perf_counter()
+        with count_queries(engine) if engine is not None else contextlib.nullcontext() as counter:
+            try:
+                yield self
+            finally:
+                self.add_time(name, time.perf_counter() - start)
+                if counter is not None: self.add('queries', counter.count)
+
+    def add_time(self, name, seconds):
+        with self._lock: self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def add(self, name, value=1):
+        with self._lock: self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge_counters(self, counters):
+        # 子进程各自计时，墙钟时间由父进程的阶段计时体现，这里只合并计数器
+        for name, value in counters.items(): self.add(name, value)
+
+    def progress(self, done, total):
+        if self._progress: self._progress(self._current, done, total)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def as_dict(self):
+        return {'elapsed': round(self.elapsed, 6), 'timings': {k: round(v, 6) for k, v in self.timings.items()},
+                'counters': dict(self.counters)}
+
+    def summary_lines(self):
+        total = self.elapsed
+        lines = [f"--- 运行统计 (总耗时 {total:.2f}s) ---"]
+        for name, seconds in self.timings.items():
+            lines.append(f"  {name}: {seconds:.3f}s ({seconds / total * 100 if total else 0:.0f}%)")
+        counters = [f"{COUNTER_LABELS.get(k, k)} {v:,}" for k, v in self.counters.items()]
+        if counters: lines.append("  " + "，".join(counters))
+        return lines
+
+
+def timed_stage(metrics, name, engine=None):
+    return metrics.stage(name, engine) if metrics is not None else contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def profiled(enabled, path=None, top=25, log=None):
+    """enabled 时用 cProfile 包裹代码块，把统计写入 path 并在日志中输出累计耗时最高的函数。
+
+    cProfile 只记录调用线程；线程池与子进程中的耗时体现在阶段计时里，不在这里展开。
+    """
+    if not enabled:
+        yield None; return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path: profiler.dump_stats(path)
+        if log:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+            log(f"cProfile 统计{f' 已写入 {path}' if path else ''}，累计耗时前 {top} 的函数:\n"
+                f"{out.getvalue().strip()}", "INFO")
@@ -0,0 +1,96 @@
+import html
+import os
+import re
+from collections import defaultdict
+
+# --- 大图拆分 ---
+# 分区结果: [{'name': 分区名, 'relations': [(from, to)], 'stubs': {外部节点}}]
+# stubs 是分区外、但与分区内节点有连线的表，渲染为虚线框以保留跨分区的关系
+PARTITION_MODES = ('none', 'component', 'schema', 'prefix')
+
+
+def get_default_render_settings():
+    return {'partition': 'none', 'large_graph_threshold': 500, 'processes': 4}
+
+
+def connected_components(relations):
+    """并查集求弱连通分量，按分量大小降序返回节点集合列表。"""
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent.setdefault(root, root) != root: root = parent[root]
+        while parent[x] != root: parent[x], x = root, parent[x]
+        return root
+    for f, t in relations:
+        rf, rt = find(f), find(t)
+        if rf != rt: parent[rf] = rt
+    groups = defaultdict(set)
+    for node in parent: groups[find(node)].add(node)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def schema_key(node):
+    # "schema.table" 或多库合并时的 "库名.table"
+    return node.rsplit('.', 1)[0] if '.' in node else '(default)'
+
+
+def prefix_key(node):
+    name = node.rsplit('.', 1)[-1]
+    head, sep, _ = name.partition('_')
+    return head.lower() if sep and head else '(other)'
+
+
+def partition_relations(relations, mode):
+    if mode == 'component':
+        node_part = {}
+        for i, nodes in enumerate(connected_components(relations), 1):
+            for node in nodes: node_part[node] = f"component_{i}"
+        key = node_part.__getitem__
+    elif mode == 'schema':
+        key = schema_key
+    elif mode == 'prefix':
+        key = prefix_key
+    else:
+        raise ValueError(f"未知的分区方式: {mode}")
+    parts = defaultdict(lambda: {'relations': [], 'stubs': set()})
+    for f, t in relations:
+        kf, kt = key(f), key(t)
+        parts[kf]['relations'].append((f, t))
+        if kf != kt:
+            parts[kf]['stubs'].add(t)
+            parts[kt]['relations'].append((f, t)); parts[kt]['stubs'].add(f)
+    result = [{'name': name, **part} for name, part in parts.items()]
+    result.sort(key=lambda p: len(p['relations']), reverse=True)
+    return result
+
+
+def choose_layout(node_count, spline, threshold):
+    """返回 (布局引擎, splines)。节点数超过阈值时改用 sfdp，并把 ortho 等昂贵连线降级。"""
+    if node_count <= threshold: return 'dot', spline
+    if node_count <= threshold * 4: return 'sfdp', 'spline' if spline == 'ortho' else spline
+    return 'sfdp', 'line'
+
+
+def safe_file_part(name):
+    return re.sub(r'[^\w.-]+', '_', name)[:60] or 'part'
+
+
+def write_index_page(path, title, entries):
+    """entries: [(分区名, 文件路径, 节点数, 关系数)]，生成链接各分区文件的 HTML 索引页。"""
+    base = os.path.dirname(os.path.abspath(path))
+    rows = "\n".join(
+        f'<tr><td><a href="{html.escape(os.path.relpath(file_path, base).replace(os.sep, "/"))}">'
+        f'{html.escape(name)}</a></td><td>{nodes}</td><td>{edges}</td></tr>'
+        for name, file_path, nodes, edges in entries)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="zh"><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>body{{font-family:Segoe UI,Verdana,Arial;margin:2em;color:#333}}table{{border-collapse:collapse}}
+td,th{{border:1px solid #ccc;padding:4px 12px;text-align:left}}</style></head>
+<body><h1>{html.escape(title)}</h1><p>共 {len(entries)} 个分区</p>
+<table><tr><th>分区</th><th>表数量</th><th>关系数</th></tr>
+{rows}
+</table></body></html>
+""")
+    return path
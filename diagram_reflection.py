@@ -0,0 +1,384 @@
+import contextlib
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, event, inspect, text, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+
+from diagram_jobs import JobCancelledError
+
+# 传给 schemas 参数时表示扫描全部用户Schema
+ALL_SCHEMAS = '*'
+PG_SYSTEM_SCHEMAS = ('information_schema', 'pg_catalog', 'pg_toast')
+MYSQL_SYSTEM_SCHEMAS = ('information_schema', 'mysql', 'performance_schema', 'sys')
+DB_DIALECT_MAP = {"MySQL": "mysql+pymysql", "PostgreSQL": "postgresql+psycopg2", "SQLite": "sqlite"}
+
+
+# --- 引擎创建 ---
+def create_db_engine(db_type_key, details, pool_size=None):
+    """details 使用界面/配置中的键: 主机、端口、用户名、密码、数据库。
+
+    pool_size 指定时，连接池大小与并行反射的线程数一致，多个线程共享同一个引擎。
+    """
+    dialect = DB_DIALECT_MAP.get(db_type_key)
+    if not dialect: raise ValueError(f"不支持的数据库类型: {db_type_key}")
+    if db_type_key == "SQLite":
+        if not details.get('数据库'): raise ValueError("SQLite需要指定数据库文件路径。")
+        return create_engine(f"{dialect}:///{details['数据库']}")
+    pool_kwargs = {'pool_size': pool_size, 'max_overflow': 0, 'pool_pre_ping': True} if pool_size else {}
+    return create_engine(
+        f"{dialect}://{details.get('用户名', '')}:{details.get('密码', '')}@{details.get('主机', '')}:"
+        f"{details.get('端口', '')}/{details.get('数据库', '')}", **pool_kwargs)
+
+
+def map_parallel(func, items, workers=1):
+    """在有界线程池中按顺序映射；workers<=1 或只有一项时直接串行执行。"""
+    items = list(items)
+    if workers <= 1 or len(items) <= 1: return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+# --- 查询计数：用于统计目录查询的往返次数 ---
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@contextlib.contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+# --- 批量外键反射 ---
+# 每种方言用一条基于集合的目录查询取回整个Schema（或全部Schema）的外键，
+# 行格式统一为: (schema, table, constraint, column, referred_schema, referred_table, referred_column)
+_MYSQL_FK_SQL = """
+SELECT k.TABLE_SCHEMA, k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME,
+       k.REFERENCED_TABLE_SCHEMA, k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME
+FROM information_schema.KEY_COLUMN_USAGE k
+WHERE k.REFERENCED_TABLE_NAME IS NOT NULL AND {where}
+ORDER BY k.TABLE_SCHEMA, k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION
+"""
+
+_PG_FK_SQL = """
+SELECT cn.nspname, c.relname, con.conname, a.attname, rn.nspname, r.relname, ra.attname
+FROM pg_catalog.pg_constraint con
+JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+JOIN pg_catalog.pg_namespace cn ON cn.oid = c.relnamespace
+JOIN pg_catalog.pg_class r ON r.oid = con.confrelid
+JOIN pg_catalog.pg_namespace rn ON rn.oid = r.relnamespace
+CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, refnum, ord)
+JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+JOIN pg_catalog.pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.refnum
+WHERE con.contype = 'f' AND {where}
+ORDER BY cn.nspname, c.relname, con.conname, k.ord
+"""
+
+_SQLITE_FK_SQL = """
+SELECT m.name, p.id, p."from", p."table",
+       COALESCE(p."to", (SELECT ti.name FROM pragma_table_info(p."table", '{schema}') ti WHERE ti.pk = p.seq + 1))
+FROM "{schema}".sqlite_master m
+JOIN pragma_foreign_key_list(m.name, '{schema}') p
+WHERE m.type = 'table'
+ORDER BY m.name, p.id, p.seq
+"""
+
+
+def _schema_filter(column, schemas, default_expr, system_schemas):
+    if schemas is None:
+        return f"{column} = {default_expr}", {}
+    if schemas == ALL_SCHEMAS:
+        return f"{column} NOT IN :system_schemas", {'system_schemas': list(system_schemas)}
+    return f"{column} IN :schemas", {'schemas': list(schemas)}
+
+
+def _run_catalog_query(conn, sql, params):
+    stmt = text(sql)
+    for name in params: stmt = stmt.bindparams(bindparam(name, expanding=True))
+    return conn.execute(stmt, params).fetchall()
+
+
+def _fetch_mysql_rows(conn, schemas):
+    where, params = _schema_filter('k.TABLE_SCHEMA', schemas, 'DATABASE()', MYSQL_SYSTEM_SCHEMAS)
+    return _run_catalog_query(conn, _MYSQL_FK_SQL.format(where=where), params)
+
+
+def _fetch_postgresql_rows(conn, schemas):
+    where, params = _schema_filter('cn.nspname', schemas, 'current_schema()', PG_SYSTEM_SCHEMAS)
+    if schemas == ALL_SCHEMAS: where += " AND cn.nspname NOT LIKE 'pg\\_temp\\_%'"
+    return _run_catalog_query(conn, _PG_FK_SQL.format(where=where), params)
+
+
+def _fetch_sqlite_rows(conn, schemas):
+    if schemas is None:
+        schemas = ['main']
+    elif schemas == ALL_SCHEMAS:
+        schemas = [row[1] for row in conn.exec_driver_sql("PRAGMA database_list") if row[1] != 'temp']
+    rows = []
+    for schema in schemas:
+        quoted = schema.replace('"', '""').replace("'", "''")
+        try:
+            result = conn.exec_driver_sql(_SQLITE_FK_SQL.format(schema=quoted)).fetchall()
+        except SQLAlchemyError:
+            # 旧版SQLite(<3.16)不支持表值PRAGMA函数，退化为同一连接上逐表执行PRAGMA
+            result = []
+            tables = conn.exec_driver_sql(
+                f"SELECT name FROM \"{quoted}\".sqlite_master WHERE type = 'table' ORDER BY name").fetchall()
+            for (table,) in tables:
+                quoted_table = table.replace('"', '""')
+                pragma = conn.exec_driver_sql(f"PRAGMA \"{quoted}\".foreign_key_list(\"{quoted_table}\")")
+                result.extend((table, r[0], r[3], r[2], r[4]) for r in pragma)
+            # 省略被引用列时(REFERENCES t)，外键指向目标表的主键
+            pk_cache = {}
+            for i, (table, fk_id, col, ref_table, ref_col) in enumerate(result):
+                if ref_col is None:
+                    if ref_table not in pk_cache:
+                        quoted_ref = ref_table.replace('"', '""')
+                        info = conn.exec_driver_sql(f"PRAGMA \"{quoted}\".table_info(\"{quoted_ref}\")").fetchall()
+                        pk_cache[ref_table] = [r[1] for r in sorted(info, key=lambda r: r[5]) if r[5]]
+                    pks = pk_cache[ref_table]
+                    seq = sum(1 for r in result[:i] if r[0] == table and r[1] == fk_id)
+                    result[i] = (table, fk_id, col, ref_table, pks[seq] if seq < len(pks) else None)
+        # SQLite的外键没有约束名，用(表, id)区分同一张表上的多个外键
+        rows.extend((schema, table, fk_id, col, schema, ref_table, ref_col)
+                    for table, fk_id, col, ref_table, ref_col in result)
+    return rows
+
+
+_BULK_FETCHERS = {'mysql': _fetch_mysql_rows, 'mariadb': _fetch_mysql_rows,
+                  'postgresql': _fetch_postgresql_rows, 'sqlite': _fetch_sqlite_rows}
+
+
+def _group_fk_rows(rows):
+    fks = OrderedDict()
+    for schema, table, name, col, ref_schema, ref_table, ref_col in rows:
+        fk = fks.get((schema, table, name))
+        if fk is None:
+            fk = fks[(schema, table, name)] = {
+                'schema': schema, 'table': table, 'name': name if isinstance(name, str) else None,
+                'constrained_columns': [], 'referred_schema': ref_schema, 'referred_table': ref_table,
+                'referred_columns': []}
+        fk['constrained_columns'].append(col)
+        fk['referred_columns'].append(ref_col)
+    return list(fks.values())
+
+
+def _convert_fk(schema, table_name, fk):
+    return {'schema': schema, 'table': table_name, 'name': fk.get('name'),
+            'constrained_columns': fk['constrained_columns'],
+            'referred_schema': fk.get('referred_schema') or schema,
+            'referred_table': fk['referred_table'], 'referred_columns': fk['referred_columns']}
+
+
+def list_user_schemas(engine):
+    return [s for s in inspect(engine).get_schema_names() if s not in PG_SYSTEM_SCHEMAS + MYSQL_SYSTEM_SCHEMAS]
+
+
+def _reflect_schema_with_inspector(engine, schema):
+    # Inspector 自带的缓存不是线程安全的，每个线程各用一个
+    inspector = inspect(engine)
+    return [_convert_fk(schema, table_name, fk) for table_name in inspector.get_table_names(schema=schema)
+            for fk in inspector.get_foreign_keys(table_name, schema=schema)]
+
+
+def _reflect_with_inspector(engine, schemas, workers=1):
+    if schemas == ALL_SCHEMAS: schemas = list_user_schemas(engine)
+    per_schema = map_parallel(lambda schema: _reflect_schema_with_inspector(engine, schema), schemas or [None],
+                              workers)
+    return [fk for fks in per_schema for fk in fks]
+
+
+def reflect_foreign_keys(engine, schemas=None, log=None, bulk=True, workers=1):
+    """一次性取回外键。schemas: None=默认Schema, ALL_SCHEMAS=全部用户Schema, 或Schema名列表。
+
+    已知方言每个Schema集合只发一条目录查询；未知方言或批量查询失败时退回逐表的 Inspector 路径，
+    此时各Schema在 workers 个线程中并行反射。
+    """
+    fetcher = _BULK_FETCHERS.get(engine.dialect.name) if bulk else None
+    if fetcher:
+        try:
+            with engine.connect() as conn:
+                return _group_fk_rows(fetcher(conn, schemas))
+        except SQLAlchemyError as e:
+            if log: log(f"批量目录查询失败，回退到逐表反射: {e}", "INFO")
+    elif log and bulk:
+        log(f"方言 {engine.dialect.name} 不支持批量外键查询，使用逐表反射。", "INFO")
+    return _reflect_with_inspector(engine, schemas, workers)
+
+
+def fk_relations(fks, qualify_schema=False):
+    """(表, 被引用表) 集合；qualify_schema 为真时表名写成 "schema.table"，供按Schema分区使用。"""
+    if not qualify_schema: return {(fk['table'], fk['referred_table']) for fk in fks}
+    return {(f"{fk['schema']}.{fk['table']}" if fk['schema'] else fk['table'],
+             f"{fk['referred_schema']}.{fk['referred_table']}" if fk['referred_schema'] else fk['referred_table'])
+            for fk in fks}
+
+
+# --- 表级修改标记：用于快照缓存的增量刷新 ---
+# 行格式: (schema, table, marker)，marker 在表结构变化后会改变
+_MYSQL_MARKER_SQL = """
+SELECT t.TABLE_SCHEMA, t.TABLE_NAME, CONCAT_WS('|', t.CREATE_TIME, t.UPDATE_TIME)
+FROM information_schema.TABLES t
+WHERE t.TABLE_TYPE = 'BASE TABLE' AND {where}
+"""
+
+# pg_class 的 xmin 不覆盖只改列的 DDL (RENAME COLUMN、SET/DROP NOT NULL 只更新 pg_attribute)，
+# 因此再拼上该表各列行中最新的 xmin
+_PG_MARKER_SQL = """
+SELECT n.nspname, c.relname,
+       c.xmin::text || ':' || COALESCE((SELECT string_agg(con.xmin::text, ',' ORDER BY con.oid)
+                                        FROM pg_catalog.pg_constraint con WHERE con.conrelid = c.oid), '')
+       || ':' || COALESCE((SELECT max(a.xmin::text::bigint)::text FROM pg_catalog.pg_attribute a
+                           WHERE a.attrelid = c.oid AND a.attnum > 0), '')
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p') AND {where}
+"""
+
+
+def _fetch_mysql_markers(conn, schemas):
+    where, params = _schema_filter('t.TABLE_SCHEMA', schemas, 'DATABASE()', MYSQL_SYSTEM_SCHEMAS)
+    return _run_catalog_query(conn, _MYSQL_MARKER_SQL.format(where=where), params)
+
+
+def _fetch_postgresql_markers(conn, schemas):
+    where, params = _schema_filter('n.nspname', schemas, 'current_schema()', PG_SYSTEM_SCHEMAS)
+    if schemas == ALL_SCHEMAS: where += " AND n.nspname NOT LIKE 'pg\\_temp\\_%'"
+    return _run_catalog_query(conn, _PG_MARKER_SQL.format(where=where), params)
+
+
+def _fetch_sqlite_markers(conn, schemas):
+    if schemas is None:
+        schemas = ['main']
+    elif schemas == ALL_SCHEMAS:
+        schemas = [row[1] for row in conn.exec_driver_sql("PRAGMA database_list") if row[1] != 'temp']
+    rows = []
+    for schema in schemas:
+        quoted = schema.replace('"', '""')
+        result = conn.exec_driver_sql(f"SELECT name, sql FROM \"{quoted}\".sqlite_master "
+                                      f"WHERE type = 'table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'")
+        # sqlite_master 保存建表语句原文，取其摘要作为标记
+        rows.extend((schema, name, hashlib.md5((sql or '').encode('utf-8')).hexdigest()[:16])
+                    for name, sql in result)
+    return rows
+
+
+_MARKER_FETCHERS = {'mysql': _fetch_mysql_markers, 'mariadb': _fetch_mysql_markers,
+                    'postgresql': _fetch_postgresql_markers, 'sqlite': _fetch_sqlite_markers}
+
+
+def reflect_table_markers(engine, schemas=None):
+    """返回 {(schema, table): marker}；schemas 为 None 时键中的 schema 也为 None。未知方言返回 None。"""
+    fetcher = _MARKER_FETCHERS.get(engine.dialect.name)
+    if not fetcher: return None
+    with engine.connect() as conn:
+        rows = fetcher(conn, schemas)
+    return {(None if schemas is None else schema, table): str(marker or '') for schema, table, marker in rows}
+
+
+# 同一Schema内变化的表超过该数量时，外键改用一条批量目录查询获取
+BULK_FK_THRESHOLD = 50
+# 列与主键按批反射，每批完成后汇报一次进度
+DETAIL_BATCH_SIZE = 500
+
+
+def _reflect_schema_details(engine, schema, names, details, log, advance):
+    inspector = inspect(engine)
+    for i in range(0, len(names), DETAIL_BATCH_SIZE):
+        # advance(0) 不推进进度，只触发一次回调，调用方可借此在每批开始前检查是否取消
+        advance(0)
+        batch = names[i:i + DETAIL_BATCH_SIZE]
+        if hasattr(inspector, 'get_multi_columns'):
+            cols = inspector.get_multi_columns(schema=schema, filter_names=batch)
+            pks = inspector.get_multi_pk_constraint(schema=schema, filter_names=batch)
+            for (_, t), c in cols.items(): details[(schema, t)]['columns'] = c
+            for (_, t), pk in pks.items(): details[(schema, t)]['pks'] = pk.get('constrained_columns') or []
+        else:
+            for t in batch:
+                details[(schema, t)]['columns'] = inspector.get_columns(t, schema=schema)
+                details[(schema, t)]['pks'] = inspector.get_pk_constraint(t, schema=schema)['constrained_columns']
+        advance(len(batch))
+    wanted = set(names)
+    if len(names) > BULK_FK_THRESHOLD and engine.dialect.name in _BULK_FETCHERS:
+        for fk in reflect_foreign_keys(engine, schemas=None if schema is None else [schema], log=log):
+            if fk['table'] not in wanted: continue
+            # 批量查询返回实际的Schema名 (如 SQLite 的 main)，与 _convert_fk 一致地换成请求的 schema，
+            # 否则按Schema分区时同一Schema内的外键会被当成跨分区引用
+            ref_schema = schema if fk['referred_schema'] == fk['schema'] else fk['referred_schema']
+            details[(schema, fk['table'])]['fks'].append(dict(fk, schema=schema, referred_schema=ref_schema))
+    elif hasattr(inspector, 'get_multi_foreign_keys'):
+        for (_, t), fks in inspector.get_multi_foreign_keys(schema=schema, filter_names=names).items():
+            details[(schema, t)]['fks'] = [_convert_fk(schema, t, fk) for fk in fks]
+    else:
+        for t in names:
+            details[(schema, t)]['fks'] = [_convert_fk(schema, t, fk)
+                                           for fk in inspector.get_foreign_keys(t, schema=schema)]
+
+
+def progress_advancer(progress, total):
+    """把 progress(已完成, 总数) 回调包装成线程安全的 advance(n)；progress 为空时 advance 不做任何事。"""
+    lock, state = threading.Lock(), [0]
+
+    def advance(n=1):
+        if not progress: return
+        with lock:
+            state[0] += n; done = state[0]
+        progress(done, total)
+    if progress: progress(0, total)
+    return advance
+
+
+def reflect_table_details(engine, table_keys, log=None, workers=1, progress=None):
+    """反射指定表的列、主键与外键。table_keys: {(schema, table)}；返回 {(schema, table): detail}。
+
+    不同Schema的表在 workers 个线程中并行反射，共享同一个引擎的连接池。
+    progress(已完成表数, 总表数) 在每批表反射完成后回调。
+    """
+    by_schema = defaultdict(list)
+    for schema, table in table_keys: by_schema[schema].append(table)
+    details = {key: {'columns': [], 'pks': [], 'fks': []} for key in table_keys}
+    advance = progress_advancer(progress, len(details))
+    map_parallel(lambda item: _reflect_schema_details(engine, item[0], item[1], details, log, advance),
+                 by_schema.items(), workers)
+    return details
+
+
+# --- 多数据库并行反射 ---
+def reflect_targets(targets, reflect, workers=4, log=None, progress=None):
+    """targets: {名称: engine}；reflect(engine) 在线程池中并发执行。返回 ({名称: 结果}, {名称: 异常})。"""
+    advance = progress_advancer(progress, len(targets))
+
+    def run(item):
+        name, engine = item
+        try:
+            return name, reflect(engine), None
+        except JobCancelledError:
+            raise
+        except Exception as e:
+            if log: log(f"❌ 数据库 {name} 反射失败: {e}", "ERROR")
+            return name, None, e
+        finally:
+            advance()
+    results, errors = {}, {}
+    for name, result, error in map_parallel(run, targets.items(), workers):
+        if error is None:
+            results[name] = result
+        else:
+            errors[name] = error
+    return results, errors
+
+
+def merge_target_relations(relations_by_target):
+    """合并为一张图：表名加上 "库名." 前缀，避免不同库的同名表混在一起。"""
+    return {(f"{name}.{f}", f"{name}.{t}") for name, relations in relations_by_target.items() for f, t in relations}
@@ -0,0 +1,82 @@
+import os
+import re
+import threading
+
+# --- 只改样式时的增量重绘 ---
+# 关系集与节点分类在一次生成后保留在内存中，布局结果 (Graphviz -Tdot 输出，带 pos 坐标) 保存在临时文件中；
+# 布局方向/连线样式改变需要重新布局，只改颜色时逐行替换布局文件中的颜色，再用 neato -n2 绘制
+LAYOUT_STYLE_KEYS = frozenset({'layout', 'spline'})
+_COLOR_ATTR = re.compile(r'\b(fillcolor|bgcolor)=("?)([^",\]\s;]+)\2')
+
+
+def style_changes(old, new):
+    return {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+
+def color_replacements(old_style, new_style, node_keys):
+    """返回 {属性名: {旧颜色: 新颜色}}；多个样式项共用同一旧颜色但新颜色不同时无法区分，返回 None。"""
+    fills = {}
+    for key in node_keys:
+        old, new = old_style.get(key), new_style.get(key)
+        if fills.setdefault(old, new) != new: return None
+    return {'fillcolor': {old: new for old, new in fills.items() if old != new},
+            'bgcolor': {old_style.get('bg_color'): new_style.get('bg_color')}}
+
+
+def recolor_layout(lines, replacements):
+    """逐行替换已布局 DOT 中的 fillcolor / bgcolor，坐标保持不变；返回生成器。"""
+    def replace(match):
+        attr, value = match.group(1), match.group(3)
+        new = replacements.get(attr, {}).get(value)
+        return match.group(0) if new is None or new == value else f'{attr}="{new}"'
+    for line in lines: yield _COLOR_ATTR.sub(replace, line)
+
+
+class RetainedGraph:
+    """上次出图的关系集、节点分类与布局文件 (layout_path 为 None 表示尚未布局，如文本格式)。
+
+    创建后不再修改，更新时整体替换，供多个任务线程共享读取。读取布局文件的任务先 acquire()、结束后 release()；
+    被替换后调用 discard()，布局文件在最后一个持有者释放后才删除。
+    """
+
+    def __init__(self, relations, kinds, label, style, threshold=None, config=None, output_filename=None,
+                 fmt="png", layout_path=None):
+        self.relations, self.kinds, self.label = relations, kinds, label
+        self.style, self.threshold, self.layout_path = dict(style), threshold, layout_path
+        self.config, self.output_filename, self.fmt = config, output_filename, fmt
+        self._holders, self._discarded, self._lock = 0, False, threading.Lock()
+
+    def with_layout(self, style, layout_path):
+        return RetainedGraph(self.relations, self.kinds, self.label, style, self.threshold, self.config,
+                             self.output_filename, self.fmt, layout_path)
+
+    def has_layout(self):
+        return self.layout_path is not None and os.path.exists(self.layout_path)
+
+    def acquire(self):
+        with self._lock: self._holders += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._holders -= 1
+            remove = self._discarded and self._holders == 0
+        if remove: self._remove_layout()
+
+    def discard(self):
+        """不再使用该布局；仍有任务持有时推迟到最后一次 release()。"""
+        with self._lock:
+            self._discarded = True
+            remove = self._holders == 0
+        if remove: self._remove_layout()
+
+    def _remove_layout(self):
+        # Windows 上文件可能仍被其他进程打开，删除失败时留给系统清理临时目录
+        if self.layout_path is None: return
+        try:
+            os.remove(self.layout_path)
+        except OSError:
+            pass
+
+    def node_color_keys(self):
+        return {f"node_color_{kind}" for kind in set(self.kinds.values())}
@@ -0,0 +1,252 @@
+import random
+import re
+import threading
+import time
+
+from sqlalchemy import column, func, select, table
+from sqlalchemy.exc import SQLAlchemyError
+
+from diagram_inference import NameNormalizer
+from diagram_reflection import map_parallel, progress_advancer
+
+# --- 基于数据的关系推断：列统计 + 有界样本 ---
+# 1. 每张表最多顺序读取 rows_per_table 行，得到各候选列的统计 (非空数、不同值数、最小/最大值) 与水塘抽样样本；
+#    单列主键表在读取范围内读完时保留完整的主键值集合 (哈希集合)
+# 2. 只比较类型族相同的 (子表列, 父表主键) 对：父表主键集合完整时先按值域剪枝，再在内存中检查样本包含率
+# 3. 父表未读完时，用样本值对父表主键做一次 IN 查询 (走主键索引) 验证，而不是整表比对
+# 全程受 time_budget_s 与 row_budget 约束，预算用尽时返回已确认的关系，并在日志中说明
+
+
+def get_default_sampling_settings():
+    return {'enabled': False, 'sample_size': 200, 'rows_per_table': 20000, 'row_budget': 1000000,
+            'time_budget_s': 60, 'min_overlap': 0.95, 'min_distinct': 10, 'max_verify': 5}
+
+
+# --- 类型族：只有同一类型族的列才会被比较 ---
+_INT_TYPE = re.compile(r'^((TINY|SMALL|MEDIUM|BIG)?INT(EGER)?|(SMALL|BIG)?SERIAL)\b'
+                       r'|^(NUMBER|NUMERIC|DECIMAL)(\(\s*\d+\s*(,\s*0\s*)?\))?$')
+_STR_TYPE = re.compile(r'^(N?VARCHAR2?|N?CHAR|CHARACTER( VARYING)?|(TINY|MEDIUM|LONG)?TEXT|STRING)\b')
+_UUID_TYPE = re.compile(r'^(UUID|UNIQUEIDENTIFIER)\b')
+
+
+def type_family(type_name):
+    name = type_name.strip().upper()
+    if _UUID_TYPE.match(name): return 'uuid'
+    if _INT_TYPE.match(name): return 'int'
+    if _STR_TYPE.match(name): return 'str'
+    return None
+
+
+def _normalize_value(family, value):
+    # 不同驱动返回的类型不一 (Decimal、定长 CHAR 补空格、UUID 对象)，统一后再比较
+    try:
+        if family == 'int': return int(value)
+        if family == 'uuid': return str(value).lower()
+        return str(value).rstrip()
+    except (TypeError, ValueError):
+        return None
+
+
+class SamplingBudget:
+    """时间与行数预算，多个工作线程共享。"""
+
+    def __init__(self, seconds, rows):
+        self.deadline, self.rows_left = time.monotonic() + seconds, rows
+        self.exhausted, self._lock = False, threading.Lock()
+
+    @property
+    def expired(self):
+        """时间预算是否已用完；行数预算由 take() 单独控制，已申请到的行数可以读完。"""
+        if time.monotonic() <= self.deadline: return False
+        self.exhausted = True
+        return True
+
+    def take(self, rows):
+        """申请最多 rows 行，返回实际获得的行数；预算用尽时返回 0。"""
+        with self._lock:
+            granted = 0 if self.expired else min(rows, self.rows_left)
+            self.rows_left -= granted
+            if granted < rows: self.exhausted = True
+            return granted
+
+    def give_back(self, rows):
+        with self._lock: self.rows_left += rows
+
+
+class ColumnProfile:
+    """一列在读取范围内的统计与样本。不同值数超过 DISTINCT_CAP 后只记为上限 (distinct_capped)。"""
+    DISTINCT_CAP = 1000
+
+    def __init__(self, schema, table_name, name, family):
+        self.schema, self.table, self.name, self.family = schema, table_name, name, family
+        self.rows = self.nulls = self.distinct = 0
+        self.minimum = self.maximum = None
+        self.sample, self._distinct = [], set()
+        self.distinct_capped = False
+        self.keys, self.complete = None, False
+
+    def observe(self, value, rng, sample_size):
+        self.rows += 1
+        value = None if value is None else _normalize_value(self.family, value)
+        if value is None:
+            self.nulls += 1; return
+        if self.minimum is None or value < self.minimum: self.minimum = value
+        if self.maximum is None or value > self.maximum: self.maximum = value
+        if not self.distinct_capped:
+            self._distinct.add(value)
+            if len(self._distinct) >= self.DISTINCT_CAP: self.distinct_capped, self._distinct = True, set()
+        if self.keys is not None: self.keys.add(value)
+        # 水塘抽样 (Algorithm R)
+        seen = self.rows - self.nulls
+        if len(self.sample) < sample_size:
+            self.sample.append(value)
+        else:
+            i = rng.randrange(seen)
+            if i < sample_size: self.sample[i] = value
+
+    def finish(self):
+        # 只保留计数与去重后的样本，释放不同值集合
+        self.distinct = self.DISTINCT_CAP if self.distinct_capped else len(self._distinct)
+        self.sample, self._distinct = list(dict.fromkeys(self.sample)), None
+
+
+class DataInference:
+    """按列值包含关系推断外键：子表列的样本值几乎都出现在父表单列主键中，即视为引用关系。
+
+    自增主键的取值区间大量重叠，样本常被多个父表同时包含：有名称佐证的父表直接采用；否则取主键集合最小的父表，
+    第二小的父表不到其两倍 (或两者都未读完整) 时视为歧义，不输出。低基数列 (不同值少于 min_distinct) 不参与比对。
+    """
+
+    def __init__(self, sample_size=200, rows_per_table=20000, row_budget=1000000, time_budget_s=60,
+                 min_overlap=0.95, min_distinct=10, max_verify=5, table_prefixes=(), seed=None):
+        self.sample_size, self.rows_per_table = max(1, int(sample_size)), max(1, int(rows_per_table))
+        self.row_budget, self.time_budget_s = int(row_budget), float(time_budget_s)
+        self.min_overlap, self.min_distinct, self.max_verify = float(min_overlap), int(min_distinct), int(max_verify)
+        self.normalize = NameNormalizer(table_prefixes)
+        self.seed = seed
+        self.stats = {}
+
+    @classmethod
+    def from_config(cls, conf=None, table_prefixes=()):
+        conf = {**get_default_sampling_settings(), **(conf or {})}
+        return cls(conf['sample_size'], conf['rows_per_table'], conf['row_budget'], conf['time_budget_s'],
+                   conf['min_overlap'], conf['min_distinct'], conf['max_verify'], table_prefixes, conf.get('seed'))
+
+    def infer(self, engine, tables, workers=1, progress=None, log=None):
+        """tables: [(schema, 表名, [[列名, 类型, 可空]], [主键列])]。返回 {(子表, 父表)}。
+
+        progress(done, total) 在每张表读取完、每个子表列比对完时调用 (可在其中抛出取消异常)。
+        """
+        budget = SamplingBudget(self.time_budget_s, self.row_budget)
+        self.stats = {'tables': 0, 'rows': 0, 'pairs': 0, 'queries': 0, 'ambiguous': 0, 'skipped_tables': 0}
+        stats_lock = threading.Lock()
+
+        def count(**values):
+            with stats_lock:
+                for name, value in values.items(): self.stats[name] += value
+        advance_tables = progress_advancer(progress, len(tables))
+
+        def profile(item):
+            profiles = self._profile_table(engine, item, budget, log, count)
+            advance_tables()
+            return profiles
+        profiles = [p for result in map_parallel(profile, tables, workers) for p in result]
+        parents, children = {}, []
+        for p in profiles:
+            if p.keys is not None: parents.setdefault(p.family, []).append(p)
+            elif p.distinct >= self.min_distinct and p.sample: children.append(p)
+        for family in parents: parents[family].sort(key=lambda p: (len(p.keys) if p.complete else float('inf'),
+                                                                   p.table))
+        advance_columns = progress_advancer(progress, len(children))
+
+        def match(child):
+            result = None if budget.expired else self._match(engine, child, parents.get(child.family, ()), budget,
+                                                             count)
+            advance_columns()
+            return result
+        relations = {rel for rel in map_parallel(match, children, workers) if rel}
+        self.stats['exhausted'] = budget.exhausted
+        return relations
+
+    # --- 第一步：读取样本与统计 ---
+    def _profile_table(self, engine, item, budget, log, count):
+        schema, table_name, columns, pks = item
+        families = {name: type_family(type_name) for name, type_name, _ in columns}
+        candidates = [name for name, _, _ in columns if families[name]]
+        if not candidates: return []
+        limit = budget.take(self.rows_per_table)
+        if not limit: return []
+        # 单列主键表作为候选父表；其余列 (除自身单列主键外) 作为候选子表列
+        profiles = [ColumnProfile(schema, table_name, name, families[name]) for name in candidates]
+        key_profile = None
+        if len(pks) == 1 and families.get(pks[0]):
+            key_profile = next(p for p in profiles if p.name == pks[0]); key_profile.keys = set()
+        rng = random.Random(self.seed if self.seed is None else f"{self.seed}:{schema}.{table_name}")
+        query = select(*[column(name) for name in candidates]).select_from(
+            table(table_name, schema=schema)).limit(limit)
+        rows = 0
+        try:
+            with engine.connect() as conn:
+                result = conn.execution_options(stream_results=True).execute(query)
+                while True:
+                    batch = result.fetchmany(1000)
+                    if not batch: break
+                    for row in batch:
+                        for p, value in zip(profiles, row): p.observe(value, rng, self.sample_size)
+                    rows += len(batch)
+                    if budget.expired: break
+                result.close()
+        except SQLAlchemyError as e:
+            if log: log(f"数据采样跳过表 {table_name}: {e}", "ERROR")
+            budget.give_back(limit); count(skipped_tables=1); return []
+        budget.give_back(limit - rows)
+        count(tables=1, rows=rows)
+        if key_profile is not None:
+            key_profile.complete = rows < limit and not budget.exhausted
+            if not key_profile.complete: key_profile.keys = set()
+        for p in profiles: p.finish()
+        return [p for p in profiles if p is key_profile or p.name not in pks or len(pks) > 1]
+
+    # --- 第二、三步：比对 ---
+    def _named(self, stem, parent):
+        # 列名词干与父表名一致 (或以父表名开头，如 customer_no -> customer) 作为名称佐证
+        key = self.normalize(parent.table)
+        return key == stem or (len(key) >= 3 and stem.startswith(key))
+
+    def _match(self, engine, child, parents, budget, count):
+        stem = self.normalize(child.name)
+        # 有名称佐证的父表优先；其余保持主键集合从小到大的顺序 (sorted 是稳定排序)
+        ordered = sorted((p for p in parents if not (p.table == child.table and p.name == child.name)),
+                         key=lambda p: not self._named(stem, p))
+        confirmed, verified = [], 0
+        for parent in ordered:
+            if budget.expired: break
+            if parent.complete:
+                if parent.minimum is None or child.minimum < parent.minimum or child.maximum > parent.maximum: continue
+                count(pairs=1)
+                hits = sum(1 for value in child.sample if value in parent.keys)
+            else:
+                # 父表主键不完整：样本值对主键做 IN 查询，单次最多 sample_size 个值，走索引
+                if verified >= self.max_verify or not budget.take(len(child.sample)): continue
+                verified += 1; count(pairs=1, queries=1)
+                hits = self._lookup(engine, parent, child.sample)
+            if hits / len(child.sample) < self.min_overlap: continue
+            if self._named(stem, parent): return child.table, parent.table
+            confirmed.append(parent)
+        if not confirmed: return None
+        # confirmed 已按主键集合大小排序，未读完整的父表在最后
+        if len(confirmed) == 1 or (confirmed[0].complete and (not confirmed[1].complete
+                                                              or len(confirmed[0].keys) * 2 <= len(confirmed[1].keys))):
+            return child.table, confirmed[0].table
+        count(ambiguous=1)
+        return None
+
+    def _lookup(self, engine, parent, values):
+        key = column(parent.name)
+        query = select(func.count()).select_from(table(parent.table, key, schema=parent.schema)).where(
+            key.in_(values))
+        try:
+            with engine.connect() as conn:
+                return conn.execute(query).scalar() or 0
+        except SQLAlchemyError:
+            return 0
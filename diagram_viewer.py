@@ -0,0 +1,290 @@
+import math
+import re
+import tkinter as tk
+from collections import defaultdict
+from tkinter import ttk
+
+# --- 内置查看器 ---
+# 读取 Graphviz plain 格式的布局 (节点中心/尺寸与连线控制点)，建立均匀网格空间索引；
+# 平移缩放时只绘制与视口相交的条目，缩小到一定程度后节点改画成无文字的小方块、连线改画成直线
+POINTS_PER_INCH = 72
+_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def _tokens(line):
+    return [m.group(2) if m.group(1) is None else m.group(1).replace('\\"', '"') for m in _TOKEN.finditer(line)]
+
+
+class GridIndex:
+    """均匀网格空间索引：每个格子记录与其相交的条目，查询时只访问矩形覆盖到的格子。"""
+
+    def __init__(self, cell=200.0):
+        self.cell, self.cells = float(cell), defaultdict(set)
+
+    def _span(self, low, high):
+        return range(int(low // self.cell), int(high // self.cell) + 1)
+
+    def insert(self, item, x0, y0, x1, y1):
+        for cx in self._span(x0, x1):
+            for cy in self._span(y0, y1): self.cells[(cx, cy)].add(item)
+
+    def insert_path(self, item, pts):
+        """登记一条由三次贝塞尔曲线段组成的连线 (pts 为 x, y 交替的控制点)，只登记曲线经过的格子。"""
+        cell, keys = self.cell, set()
+        for j in range(0, len(pts) - 7, 6):
+            x0, y0, x1, y1, x2, y2, x3, y3 = pts[j:j + 8]
+            # 控制多边形长度是曲线长度的上界，采样间距不超过一个格子
+            n = max(1, math.ceil((math.hypot(x1 - x0, y1 - y0) + math.hypot(x2 - x1, y2 - y1)
+                                  + math.hypot(x3 - x2, y3 - y2)) / cell))
+            for k in range(n + 1):
+                t = k / n; u = 1 - t
+                a, b, c, d = u * u * u, 3 * u * u * t, 3 * u * t * t, t * t * t
+                x, y = a * x0 + b * x1 + c * x2 + d * x3, a * y0 + b * y1 + c * y2 + d * y3
+                keys.add((int(x // cell), int(y // cell)))
+        for key in keys: self.cells[key].add(item)
+
+    def query(self, x0, y0, x1, y1):
+        found = set()
+        for cx in self._span(x0, x1):
+            for cy in self._span(y0, y1):
+                items = self.cells.get((cx, cy))
+                if items: found |= items
+        return found
+
+
+class ViewerModel:
+    """查看器数据：节点框、连线控制点、邻接关系与空间索引。坐标单位为点 (1/72 英寸)，y 轴向下。
+
+    在任务线程中构建，构建后不再修改；kinds 为节点分类映射，用于按当前样式着色。
+    """
+
+    def __init__(self, text, kinds=None):
+        self.kinds = kinds or {}
+        self.nodes, self.edges = {}, []  # 表名 -> (x0, y0, x1, y1)；[(子表, 父表, [x, y, x, y, ...])]
+        self.outgoing, self.incoming = defaultdict(list), defaultdict(list)  # 表名 -> 连线下标
+        self.width = self.height = 0.0
+        self._parse(text)
+        heights = sorted(box[3] - box[1] for box in self.nodes.values())
+        self.node_height = heights[len(heights) // 2] if heights else 36.0
+        # 格子约为几个节点大小，视口内的格子数与条目数同量级
+        self.index = GridIndex(max(self.node_height * 4, 50.0))
+        for name, box in self.nodes.items(): self.index.insert(('node', name), *box)
+        # 连线沿曲线登记，避免长连线的外接矩形覆盖大片格子
+        for i, (_, _, pts) in enumerate(self.edges): self.index.insert_path(('edge', i), pts)
+
+    def visible(self, x0, y0, x1, y1):
+        """返回与矩形相交的条目 {('node', 表名) | ('edge', 下标)}；矩形覆盖整张图时不查索引。"""
+        if x0 <= 0 and y0 <= 0 and x1 >= self.width and y1 >= self.height:
+            return {('node', name) for name in self.nodes} | {('edge', i) for i in range(len(self.edges))}
+        # 相邻采样点之间的曲线可能经过未登记的相邻格子，查询范围向外扩一个格子
+        pad = self.index.cell
+        return self.index.query(x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+
+    def _parse(self, text):
+        scale = POINTS_PER_INCH
+        for line in text.splitlines():
+            parts = _tokens(line)
+            if not parts: continue
+            if parts[0] == 'graph':
+                self.width, self.height = float(parts[2]) * scale, float(parts[3]) * scale
+            elif parts[0] == 'node':
+                x, y, w, h = (float(v) * scale for v in parts[2:6])
+                y = self.height - y
+                self.nodes[parts[1]] = (x - w / 2, y - h / 2, x + w / 2, y + h / 2)
+            elif parts[0] == 'edge':
+                tail, head, n = parts[1], parts[2], int(parts[3])
+                pts = []
+                for k in range(n):
+                    pts.append(float(parts[4 + 2 * k]) * scale)
+                    pts.append(self.height - float(parts[5 + 2 * k]) * scale)
+                self.outgoing[tail].append(len(self.edges)); self.incoming[head].append(len(self.edges))
+                self.edges.append((tail, head, pts))
+
+    def node_at(self, x, y):
+        for kind, name in self.index.query(x, y, x, y):
+            if kind != 'node': continue
+            x0, y0, x1, y1 = self.nodes[name]
+            if x0 <= x <= x1 and y0 <= y <= y1: return name
+        return None
+
+    def find(self, text):
+        """按表名查找：先精确匹配，再忽略大小写，最后取第一个包含该文本的表。"""
+        if text in self.nodes: return text
+        lowered = text.lower()
+        names = sorted(self.nodes)
+        return next((n for n in names if n.lower() == lowered), None) or \
+            next((n for n in names if lowered in n.lower()), None)
+
+    def neighbours(self, name):
+        """返回 (相邻表集合, 相关连线下标集合)。"""
+        edges = set(self.outgoing.get(name, ())) | set(self.incoming.get(name, ()))
+        tables = {self.edges[i][1] for i in self.outgoing.get(name, ())} | \
+                 {self.edges[i][0] for i in self.incoming.get(name, ())}
+        tables.discard(name)
+        return tables, edges
+
+
+class DiagramViewer(ttk.Frame):
+    """可缩放、拖动的关系图查看器。左键拖动平移，滚轮缩放，单击表高亮其相邻表，双击空白处取消高亮。"""
+    GLYPH_PX = 6    # 节点高度 (像素) 小于该值时画成小方块，连线画成直线
+    DETAIL_PX = 16  # 小于该值时不绘制表名与箭头
+    HIGHLIGHT = "#E53935"
+
+    def __init__(self, parent, placeholder=""):
+        super().__init__(parent)
+        self.model, self.style, self.selected = None, {}, None
+        self.scale, self.offset, self._fit_pending = 1.0, [0.0, 0.0], False
+        self._redraw_job, self._drag, self._placeholder, self._default_placeholder = None, None, placeholder, placeholder
+
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill="x", padx=5, pady=(5, 0))
+        ttk.Button(toolbar, text="适合窗口", command=self.fit).pack(side="left", padx=(0, 5))
+        ttk.Button(toolbar, text="100%", command=lambda: self.zoom_to(1.0)).pack(side="left", padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(toolbar, textvariable=self.search_var, width=24)
+        search_entry.pack(side="left", padx=(15, 5))
+        search_entry.bind("<Return>", lambda e: self.locate(self.search_var.get()))
+        ttk.Button(toolbar, text="定位表", command=lambda: self.locate(self.search_var.get())).pack(side="left")
+        self.status_label = ttk.Label(toolbar, text="")
+        self.status_label.pack(side="right")
+
+        self.canvas = tk.Canvas(self, background="#FFFFFF", highlightthickness=0, cursor="fleur")
+        self.canvas.pack(fill="both", expand=True, padx=5, pady=5)
+        self.canvas.bind("<ButtonPress-1>", self._on_press)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self._on_release)
+        self.canvas.bind("<Double-Button-1>", lambda e: self.select(None))
+        self.canvas.bind("<MouseWheel>", lambda e: self._zoom_at(e.x, e.y, 1.2 if e.delta > 0 else 1 / 1.2))
+        self.canvas.bind("<Button-4>", lambda e: self._zoom_at(e.x, e.y, 1.2))
+        self.canvas.bind("<Button-5>", lambda e: self._zoom_at(e.x, e.y, 1 / 1.2))
+        self.canvas.bind("<Configure>", lambda e: self.fit() if self._fit_pending else self.schedule_redraw())
+
+    # --- 数据与样式 ---
+    def load(self, model, style):
+        self.model, self.style, self.selected = model, dict(style), None
+        self.fit()
+
+    def clear(self, message=None):
+        self.model, self.selected = None, None
+        self._placeholder = self._default_placeholder if message is None else message
+        self.schedule_redraw()
+
+    def set_style(self, style):
+        if dict(style) == self.style: return
+        self.style = dict(style)
+        self.schedule_redraw()
+
+    def select(self, name):
+        self.selected = name
+        self.schedule_redraw()
+
+    def locate(self, text):
+        if not self.model or not text.strip(): return
+        name = self.model.find(text.strip())
+        if name is None:
+            self.status_label.config(text=f"未找到表: {text.strip()}"); return
+        x0, y0, x1, y1 = self.model.nodes[name]
+        # 放大到能看清表名，再把该表移到视口中央
+        self.scale = max(self.scale, self.DETAIL_PX * 2 / self.model.node_height)
+        self._center_on((x0 + x1) / 2, (y0 + y1) / 2)
+        self.select(name)
+
+    # --- 视图变换 ---
+    def fit(self):
+        if not self.model: self.schedule_redraw(); return
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        # 画布尚未显示时没有尺寸，等 <Configure> 时再适配
+        self._fit_pending = w <= 1 or h <= 1
+        if self._fit_pending: return
+        self.scale = min(w / max(self.model.width, 1.0), h / max(self.model.height, 1.0)) * 0.95
+        self._center_on(self.model.width / 2, self.model.height / 2)
+
+    def zoom_to(self, scale):
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        self._zoom_at(w / 2, h / 2, scale / self.scale)
+
+    def _center_on(self, x, y):
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        self.offset = [x * self.scale - w / 2, y * self.scale - h / 2]
+        self.schedule_redraw()
+
+    def _zoom_at(self, sx, sy, factor):
+        if not self.model: return
+        scale = min(max(self.scale * factor, 0.005), 8.0)
+        # 保持光标下的点不动
+        wx, wy = (sx + self.offset[0]) / self.scale, (sy + self.offset[1]) / self.scale
+        self.scale, self.offset = scale, [wx * scale - sx, wy * scale - sy]
+        self.schedule_redraw()
+
+    def _on_press(self, event):
+        self._drag = (event.x, event.y, False)
+
+    def _on_drag(self, event):
+        if not self._drag: return
+        x, y, _ = self._drag
+        dx, dy = event.x - x, event.y - y
+        self._drag = (event.x, event.y, True)
+        # 拖动时直接移动已有图元，停下后再补画新露出的区域
+        self.offset[0] -= dx; self.offset[1] -= dy
+        self.canvas.move("all", dx, dy)
+        self.schedule_redraw(60)
+
+    def _on_release(self, event):
+        dragged = self._drag and self._drag[2]
+        self._drag = None
+        if dragged or not self.model: return
+        name = self.model.node_at((event.x + self.offset[0]) / self.scale, (event.y + self.offset[1]) / self.scale)
+        if name is not None: self.select(name)
+
+    # --- 绘制 ---
+    def schedule_redraw(self, delay=0):
+        if self._redraw_job is not None: self.after_cancel(self._redraw_job)
+        self._redraw_job = self.after(delay, self._redraw) if delay else self.after_idle(self._redraw)
+
+    def _redraw(self):
+        self._redraw_job = None
+        canvas, model = self.canvas, self.model
+        canvas.delete("all")
+        canvas.configure(background=self.style.get('bg_color', "#FFFFFF"))
+        w, h = canvas.winfo_width(), canvas.winfo_height()
+        if not model:
+            canvas.create_text(w / 2, h / 2, text=self._placeholder, fill="#888888", font=("Segoe UI", 11))
+            self.status_label.config(text=""); return
+        s, (ox, oy) = self.scale, self.offset
+        items = model.visible(ox / s, oy / s, (ox + w) / s, (oy + h) / s)
+        node_px = model.node_height * s
+        glyph, detail = node_px < self.GLYPH_PX, node_px >= self.DETAIL_PX
+        marked_tables, marked_edges = model.neighbours(self.selected) if self.selected else (set(), set())
+        edge_color = "#D0D0D0" if self.selected else "#757575"
+        nodes = [key for kind, key in items if kind == 'node']
+        edges = [key for kind, key in items if kind == 'edge']
+        # 高亮的连线最后画，避免被其他连线覆盖
+        edges.sort(key=lambda i: i in marked_edges)
+        for i in edges:
+            pts = model.edges[i][2]
+            marked = i in marked_edges
+            if glyph:
+                coords = (pts[0] * s - ox, pts[1] * s - oy, pts[-2] * s - ox, pts[-1] * s - oy)
+                canvas.create_line(*coords, fill=self.HIGHLIGHT if marked else edge_color, width=2 if marked else 1)
+                continue
+            coords = [v * s - (ox if k % 2 == 0 else oy) for k, v in enumerate(pts)]
+            # plain 输出的连线是 3n+1 个三次贝塞尔控制点，smooth="raw" 按贝塞尔曲线绘制
+            canvas.create_line(*coords, smooth="raw" if len(pts) % 6 == 2 else False, fill=self.HIGHLIGHT if marked else edge_color,
+                               width=max(1.0, (3.0 if marked else 1.5) * min(s, 1.0)),
+                               arrow=tk.LAST if detail else tk.NONE, arrowshape=(10 * s, 12 * s, 4 * s))
+        font = ("Segoe UI", max(6, min(int(11 * s), 48)))
+        for name in nodes:
+            x0, y0, x1, y1 = model.nodes[name]
+            coords = (x0 * s - ox, y0 * s - oy, x1 * s - ox, y1 * s - oy)
+            fill = self.style.get(f"node_color_{model.kinds.get(name, 'default')}", "#FFFFFF")
+            if name == self.selected: outline, width = self.HIGHLIGHT, 3
+            elif name in marked_tables: outline, width = self.HIGHLIGHT, 2
+            else: outline, width = ("" if glyph else "#666666"), 1
+            canvas.create_rectangle(*coords, fill=fill, outline=outline, width=width)
+            if detail: canvas.create_text((coords[0] + coords[2]) / 2, (coords[1] + coords[3]) / 2, text=name,
+                                          fill="#2D2D2D", font=font)
+        status = f"缩放 {s:.0%} | 可见 {len(nodes)}/{len(model.nodes)} 张表"
+        if self.selected:
+            out_count, in_count = len(model.outgoing.get(self.selected, ())), len(model.incoming.get(self.selected, ()))
+            status = f"{self.selected}: 引用 {out_count} 张表，被 {in_count} 张表引用 | " + status
+        self.status_label.config(text=status)
@@ -0,0 +1,42 @@
+import os
+import re
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diagram_cache import SchemaCache
+from diagram_reflection import ALL_SCHEMAS, create_db_engine
+
+
+def _build_db(path, table_count=8):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t0 (id INTEGER PRIMARY KEY)")
+    for i in range(1, table_count):
+        conn.execute(f"CREATE TABLE t{i} (id INTEGER PRIMARY KEY, t{i - 1}_id INTEGER REFERENCES t{i - 1}(id))")
+    conn.commit(); conn.close()
+
+
+def _load(cache, engine, schemas):
+    messages = []
+    snapshot = cache.load_snapshot(engine, schemas=schemas, log=lambda msg, level="INFO": messages.append(msg))
+    hits, stale = map(int, re.search(r"(\d+) 张表命中缓存，(\d+) 张表需要重新反射", "\n".join(messages)).groups())
+    return snapshot, hits, stale
+
+
+def test_alternating_scopes_keep_separate_snapshots(tmp_path):
+    db_path = str(tmp_path / "scope.db")
+    _build_db(db_path)
+    engine = create_db_engine("SQLite", {'数据库': db_path})
+    cache = SchemaCache(str(tmp_path / "cache"))
+    try:
+        for schemas in (ALL_SCHEMAS, None):
+            _, hits, stale = _load(cache, engine, schemas)
+            assert (hits, stale) == (0, 8)
+        # 第二轮交替读取时两个范围都应完全命中，而不是互相覆盖后重新反射
+        for schemas in (ALL_SCHEMAS, None):
+            snapshot, hits, stale = _load(cache, engine, schemas)
+            assert (hits, stale) == (8, 0)
+            assert len(snapshot) == 8
+    finally:
+        engine.dispose()